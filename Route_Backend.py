@@ -1,131 +1,2360 @@
+import csv
+import gzip
+import heapq
+import io
+import json
+import mmap
+import os
+import queue
+import struct
 import sys
-from typing import Dict, List, Tuple
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import MutableSequence
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
-class Edge:
-    def __init__(self, src=0, dest=0, weight=0):
-        self.src = src
-        self.dest = dest 
-        self.weight = weight
+# Optional and imported on first use (vectorized engine, Floyd-Warshall),
+# so that importing this module stays cheap for short-lived batch workers
+np = None
+_numpy_missing = False
+
+RELAX_MODES = ("full", "early_exit", "queue")
+FW_BLOCK_SIZE = 256
+SCC_CLOSURE_MAX_COMPONENTS = 10000  # beyond this, reachability is searched per query
+ENGINES = ("auto", "dijkstra", "numpy", "python", "scc", "yen", "yen_random")
+YEN_SEED = 1  # permutation of the yen_random engine, fixed so runs are reproducible
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+LOAD_MAX_ERRORS = 100
+LOAD_BUFFER_SIZE = 1 << 20
+SNAPSHOT_MAGIC = b"RTGRAPH\0"
+SNAPSHOT_FORMAT = 2
+# magic, format, crc32 of the file (with this field zeroed), V, E, negative edges, name-table bytes
+SNAPSHOT_HEADER = struct.Struct("<8sIIQQQQ")
+RESULTS_PATH = "route_results.csv"
+RESULT_FORMATS = ("csv", "bin")
+RESULTS_MAGIC = b"RTDIST\0\0"
+RESULTS_FORMAT = 1
+# magic, format, V, name-table bytes; then per source: int64 source, V int64 distances
+RESULTS_HEADER = struct.Struct("<8sIQQ")
+RESULTS_SOURCE = struct.Struct("<q")
+BATCH_FORMATS = ("jsonl", "csv")
+
+
+def optional_numpy():
+    """The numpy module, imported on first call, or None if it is not installed"""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            _numpy_missing = True
+    return np
+
+class Edge(NamedTuple):
+    """A road; immutable, so changing one means assigning a new Edge into graph.edge"""
+    src: int = 0
+    dest: int = 0
+    weight: int = 0
+
+# Shared placeholder for roads not entered yet; edges are replaced, never mutated
+UNSET_EDGE = Edge()
+
+class CSR:
+    """Compressed sparse row out-adjacency in typed int64 arrays
+
+    The out-edges of u are targets/weights[offsets[u]:offsets[u + 1]], kept
+    in input order. About 16 bytes per edge instead of a tuple per edge.
+    """
+    __slots__ = ("V", "offsets", "targets", "weights")
+
+    def __init__(self, V: int, offsets: array, targets: array, weights: array):
+        self.V = V
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    @classmethod
+    def from_arrays(cls, V: int, srcs, dests, weights) -> "CSR":
+        """Counting-sort parallel (src, dest, weight) sequences by source"""
+        E = len(srcs)
+        counts = [0] * (V + 1)
+        for u in srcs:
+            counts[u + 1] += 1
+        for u in range(V):
+            counts[u + 1] += counts[u]
+        offsets = array("q", counts)
+        pos = counts[:-1]
+        targets = array("q", bytes(8 * E))
+        out_weights = array("q", bytes(8 * E))
+        for u, v, w in zip(srcs, dests, weights):
+            i = pos[u]
+            targets[i] = v
+            out_weights[i] = w
+            pos[u] = i + 1
+        return cls(V, offsets, targets, out_weights)
+
+    @classmethod
+    def from_edges(cls, V: int, edges) -> "CSR":
+        """Build from (src, dest, weight) tuples"""
+        edges = list(edges)
+        return cls.from_arrays(V, [e[0] for e in edges], [e[1] for e in edges], [e[2] for e in edges])
+
+    @property
+    def E(self) -> int:
+        return len(self.targets)
+
+    def out_edges(self, u: int):
+        """(dest, weight) pairs leaving u"""
+        a, b = self.offsets[u], self.offsets[u + 1]
+        return zip(self.targets[a:b], self.weights[a:b])
+
+    def sources(self) -> array:
+        """Source of every edge slot, aligned with targets/weights"""
+        srcs = array("q", bytes(8 * self.E))
+        for u in range(self.V):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                srcs[i] = u
+        return srcs
+
+    def reweighted(self, h: List[int]) -> "CSR":
+        """Same structure with every weight w(u, v) replaced by w + h[u] - h[v]"""
+        targets, weights, offsets = self.targets, self.weights, self.offsets
+        out = array("q", weights)
+        for u in range(self.V):
+            hu = h[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                out[i] += hu - h[targets[i]]
+        return CSR(self.V, offsets, targets, out)
+
+    def transpose(self) -> "CSR":
+        """In-adjacency: out-edges of v in the result are the roads entering v"""
+        return CSR.from_arrays(self.V, self.targets, self.sources(), self.weights)
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.targets, self.weights))
+
+class SCCIndex:
+    """Strongly connected components of a CSR graph and their condensation DAG
+
+    Components are numbered in topological order: every road between two
+    components goes from a lower to a higher id, so relaxing components in
+    id order finalizes each one before its successors. members(c) are the
+    cities of component c; cyclic[c] is set when c has a cycle (more than
+    one city or a self-loop) and negative[c] when a road inside c is
+    negative, the only components that can hold a negative cycle. With at
+    most SCC_CLOSURE_MAX_COMPONENTS components the transitive closure is
+    precomputed as one bitmask per component, so reachable() is O(1); above
+    that, masks are searched on first use and kept for the last
+    CACHE_MAX_ENTRIES source components.
+    """
+    def __init__(self, csr: CSR):
+        V, offsets, targets, weights = csr.V, csr.offsets, csr.targets, csr.weights
+        tarjan = self._tarjan(csr)
+        count = max(tarjan, default=-1) + 1
+        self.V = V
+        self.count = count
+        self.comp = array("q", (count - 1 - c for c in tarjan))
+
+        # Cities grouped by component (counting sort)
+        starts = [0] * (count + 1)
+        for c in self.comp:
+            starts[c + 1] += 1
+        for c in range(count):
+            starts[c + 1] += starts[c]
+        self.starts = array("q", starts)
+        self.order = array("q", bytes(8 * V))
+        pos = starts[:-1]
+        for v, c in enumerate(self.comp):
+            self.order[pos[c]] = v
+            pos[c] += 1
+
+        comp = self.comp
+        self.cyclic = bytearray(starts[c + 1] - starts[c] > 1 for c in range(count))
+        self.negative = bytearray(count)
+        successors: List[set] = [set() for _ in range(count)]
+        for u in range(V):
+            cu = comp[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                cv = comp[targets[i]]
+                if cv != cu:
+                    successors[cu].add(cv)
+                else:
+                    if targets[i] == u:
+                        self.cyclic[cu] = 1
+                    if weights[i] < 0:
+                        self.negative[cu] = 1
+        self.successors = [tuple(sorted(succ)) for succ in successors]
+
+        self._closure: Optional[List[int]] = None
+        self._masks: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        if count <= SCC_CLOSURE_MAX_COMPONENTS:
+            closure = [0] * count
+            for c in range(count - 1, -1, -1):
+                mask = 1 << c
+                for d in self.successors[c]:
+                    mask |= closure[d]
+                closure[c] = mask
+            self._closure = closure
+
+    @staticmethod
+    def _tarjan(csr: CSR) -> List[int]:
+        """Iterative Tarjan; components come out sinks first (reverse topological order)"""
+        V, offsets, targets = csr.V, csr.offsets, csr.targets
+        index = [-1] * V
+        low = [0] * V
+        on_stack = bytearray(V)
+        comp = [-1] * V
+        stack: List[int] = []
+        counter = count = 0
+        for root in range(V):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+            while work:
+                u, i = work[-1]
+                end = offsets[u + 1]
+                while i < end:
+                    v = targets[i]
+                    i += 1
+                    if index[v] == -1:
+                        work[-1] = (u, i)
+                        index[v] = low[v] = counter
+                        counter += 1
+                        stack.append(v)
+                        on_stack[v] = 1
+                        work.append((v, offsets[v]))
+                        break
+                    if on_stack[v] and index[v] < low[u]:
+                        low[u] = index[v]
+                else:
+                    work.pop()
+                    if low[u] == index[u]:
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = 0
+                            comp[w] = count
+                            if w == u:
+                                break
+                        count += 1
+                    if work and low[u] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[u]
+        return comp
+
+    def members(self, c: int) -> array:
+        return self.order[self.starts[c]:self.starts[c + 1]]
+
+    def reach(self, c: int) -> int:
+        """Bitmask of the components reachable from component c (c included)"""
+        if self._closure is not None:
+            return self._closure[c]
+        with self._lock:
+            mask = self._masks.get(c)
+            if mask is not None:
+                self._masks.move_to_end(c)
+                return mask
+        mask = 1 << c
+        todo = [c]
+        while todo:
+            for d in self.successors[todo.pop()]:
+                if not mask >> d & 1:
+                    mask |= 1 << d
+                    todo.append(d)
+        with self._lock:
+            self._masks[c] = mask
+            if len(self._masks) > CACHE_MAX_ENTRIES:
+                self._masks.popitem(last=False)
+        return mask
+
+    def reachable(self, src: int, dest: int) -> bool:
+        """Whether any route leads from city src to city dest"""
+        return bool(self.reach(self.comp[src]) >> self.comp[dest] & 1)
+
+class YenOrder:
+    """A vertex order and the roads split by it, for Yen's Bellman-Ford
+
+    forward holds the roads from each city to cities later in order,
+    backward those to earlier ones; row i of both is the city order[i].
+    Relaxing forward rows first to last and then backward rows last to
+    first carries a distance along a whole monotone run of a route in one
+    sweep, so a pass of both sweeps covers two runs. A route of at most
+    V - 1 roads that starts with a backward run spends the first pass's
+    forward sweep idle, so ceil(V / 2) passes suffice. Self-loops go with
+    the forward roads, so a negative one keeps every pass updating and is
+    caught by the cycle check.
+    """
+    __slots__ = ("order", "forward", "backward")
+
+    def __init__(self, csr: CSR, order: List[int]):
+        V, offsets, targets, weights = csr.V, csr.offsets, csr.targets, csr.weights
+        pos = [0] * V
+        for i, v in enumerate(order):
+            pos[v] = i
+        split = ([], [], []), ([], [], [])
+        for u in range(V):
+            pu = pos[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                rows, dests, ws = split[pos[v] < pu]
+                rows.append(pu)
+                dests.append(v)
+                ws.append(weights[i])
+        self.order = array("q", order)
+        self.forward = CSR.from_arrays(V, *split[0])
+        self.backward = CSR.from_arrays(V, *split[1])
+
+class EdgeList(MutableSequence):
+    """Edge list that reports every replaced, added or removed edge to its graph
+
+    Every mutator (append, remove, clear, slice assignment, ...) goes
+    through __setitem__, __delitem__ or insert, so none can bypass the
+    graph's version and negative-edge count.
+    """
+    def __init__(self, graph: "Graph", edges):
+        self._items = list(edges)
+        self.graph = graph
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Edge]:
+        return iter(self._items)
+
+    def __repr__(self) -> str:
+        return repr(self._items)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            old = self._items[index]
+            self._items[index] = value
+            self.graph.E = len(self._items)
+            for e in old:
+                self.graph._edge_changed(e, None)
+            for e in self._items[index]:
+                self.graph._edge_changed(None, e)
+            return
+        old = self._items[index]
+        self._items[index] = value
+        self.graph._edge_changed(old, value)
+
+    def __delitem__(self, index):
+        old = self._items[index] if isinstance(index, slice) else [self._items[index]]
+        del self._items[index]
+        self.graph.E = len(self._items)
+        for e in old:
+            self.graph._edge_changed(e, None)
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+        self.graph.E = len(self._items)
+        self.graph._edge_changed(None, value)
+
+    def clear(self):
+        del self[:]
+
+class DistanceCache:
+    """LRU cache of per-source distance lists (and parent arrays) for one graph version
+
+    Entries are keyed by (version, src); bumping the version through
+    invalidate() drops every older entry. Eviction is least-recently-used
+    once max_entries or (approximately) max_bytes is exceeded. The parent
+    array of an entry is optional (None when only distances are known).
+    All operations hold a lock, so worker threads can share one cache.
+    """
+    def __init__(self, max_entries: Optional[int] = CACHE_MAX_ENTRIES,
+                 max_bytes: Optional[int] = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[List[int], Optional[List[int]]]]" = OrderedDict()
+
+    @staticmethod
+    def entry_bytes(dist: List[int], parent: Optional[List[int]] = None) -> int:
+        # List header and pointers plus one int object per slot (upper bound)
+        size = sys.getsizeof(dist) + 32 * len(dist)
+        if parent is not None:
+            size += sys.getsizeof(parent) + 32 * len(parent)
+        return size
+
+    def get(self, src: int) -> Optional[List[int]]:
+        """Cached distances for src, counted as a hit or miss"""
+        with self._lock:
+            key = (self.version, src)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_tree(self, src: int) -> Optional[Tuple[List[int], List[int]]]:
+        """Cached (dist, parent) for src; entries without a parent array count as misses"""
+        with self._lock:
+            key = (self.version, src)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, src: int, dist: List[int], parent: Optional[List[int]] = None):
+        with self._lock:
+            key = (self.version, src)
+            size = self.entry_bytes(dist, parent)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            if key in self._entries:
+                self.bytes -= self.entry_bytes(*self._entries.pop(key))
+            self._entries[key] = (dist, parent)
+            self.bytes += size
+            while ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= self.entry_bytes(*evicted)
+                self.evictions += 1
+
+    def invalidate(self, version: int):
+        """Switch to a new graph version, dropping all older entries"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+                self.bytes = 0
+            self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+    def __contains__(self, src: int) -> bool:
+        with self._lock:
+            return (self.version, src) in self._entries
+
+    def __getitem__(self, src: int) -> List[int]:
+        with self._lock:
+            key = (self.version, src)
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def __setitem__(self, src: int, dist: List[int]):
+        self.put(src, dist)
+
+    def __delitem__(self, src: int):
+        with self._lock:
+            self.bytes -= self.entry_bytes(*self._entries.pop((self.version, src)))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __iter__(self):
+        with self._lock:
+            return (src for _, src in list(self._entries))
+
+    def items(self) -> List[Tuple[int, List[int], Optional[List[int]]]]:
+        """(src, dist, parent) triples in LRU order without touching recency or counters"""
+        with self._lock:
+            return [(src, dist, parent) for (_, src), (dist, parent) in self._entries.items()]
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one computation
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception) instead of
+    computing it again. computed counts functions actually run, coalesced
+    counts the computations saved.
+    """
+    def __init__(self):
+        self.computed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[object, "Future"] = {}
+
+    def _join(self, key) -> Tuple["Future", bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            from concurrent.futures import Future  # loaded by the first query, not at import
+            future = self._calls[key] = Future()
+            # A cancelled waiter must not cancel the shared call
+            future.set_running_or_notify_cancel()
+            self.computed += 1
+            return future, True
+
+    def _run(self, key, future: "Future", fn, args):
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+        else:
+            self._finish(key)
+            future.set_result(result)
+
+    def _finish(self, key):
+        with self._lock:
+            del self._calls[key]
+
+    def do(self, key, fn, *args):
+        """fn(*args), shared with any concurrent call for key (blocking)"""
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args)
+        return future.result()
+
+    async def do_async(self, key, fn, *args, executor=None):
+        """fn(*args) run on executor, shared with any concurrent call for key (awaitable)"""
+        import asyncio
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(executor, self._run, key, future, fn, args)
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"computed": self.computed, "coalesced": self.coalesced,
+                    "in_flight": len(self._calls)}
+
+class QueryCancelled(Exception):
+    """Raised from a progress callback to abort the query it reports on"""
+
+class BackgroundQuery:
+    """Runs one query at a time on a worker thread for an event-loop UI
+
+    start() cancels the outstanding run, which stops at its next pass and
+    is then ignored, and calls fn(progress) on a new thread; fn hands
+    progress to the engine. Results come back through a queue drained by
+    poll(), which schedule(ms, callback) - e.g. Tk's root.after - keeps
+    calling on the UI thread, so every callback runs on that thread.
+    """
+    def __init__(self, schedule, interval_ms: int = 50):
+        self.schedule = schedule
+        self.interval_ms = interval_ms
+        self._results: "queue.Queue[Tuple[int, str, object]]" = queue.Queue()
+        self._generation = 0
+        self._cancel: Optional[threading.Event] = None
+        self._callbacks = (None, None, None)
+        self._polling = False
+
+    @property
+    def running(self) -> bool:
+        return self._cancel is not None
+
+    def start(self, fn, on_done, on_progress=None, on_error=None):
+        self.cancel()
+        self._generation += 1
+        generation = self._generation
+        cancel = self._cancel = threading.Event()
+        self._callbacks = (on_done, on_progress, on_error)
+
+        def progress(done: int, total: int):
+            if cancel.is_set():
+                raise QueryCancelled()
+            self._results.put((generation, "progress", (done, total)))
+
+        def work():
+            try:
+                result = fn(progress)
+            except QueryCancelled:
+                return
+            except Exception as e:
+                self._results.put((generation, "error", e))
+            else:
+                self._results.put((generation, "done", result))
+
+        threading.Thread(target=work, daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.schedule(self.interval_ms, self.poll)
+
+    def cancel(self):
+        """Stop the outstanding run; its result, if any, is dropped"""
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+
+    def poll(self):
+        on_done, on_progress, on_error = self._callbacks
+        latest = None
+        while True:
+            try:
+                generation, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation or self._cancel is None:
+                continue  # superseded or cancelled run
+            if kind == "progress":
+                latest = payload
+                continue
+            self._cancel = None
+            latest = None
+            if kind == "done":
+                on_done(payload)
+            elif on_error is not None:
+                on_error(payload)
+        if latest is not None and on_progress is not None:
+            on_progress(*latest)
+        if self._cancel is None and self._results.empty():
+            self._polling = False
+        else:
+            self.schedule(self.interval_ms, self.poll)
+
+class Instrumentation:
+    """Opt-in per-query counters and timers for a Graph
+
+    Attach with graph.instrumentation = Instrumentation(sink, ...). While
+    it is None (the default) a query costs one attribute test. Otherwise
+    every bellman_ford/shortest_path_tree call produces a record - the
+    engine's last_stats (passes, relaxations, early-exit pass, time in the
+    negative-cycle check) plus source, wall time and the cache hit ratio -
+    which is kept as last, added to the running totals and passed to each
+    sink (any callable taking the record, e.g. a JSONDumpSink).
+    """
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+        self.last: Optional[Dict[str, object]] = None
+        self.totals = {"queries": 0, "cache_hits": 0, "seconds": 0.0, "passes": 0,
+                       "relaxations": 0, "cycle_check_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def record(self, graph: "Graph", src: int, seconds: float):
+        cache = graph.distance_cache
+        lookups = cache.hits + cache.misses
+        record = dict(graph.last_stats, source=src, version=graph.version, seconds=seconds,
+                      cache_hit_ratio=cache.hits / lookups if lookups else 0.0)
+        with self._lock:
+            totals = self.totals
+            totals["queries"] += 1
+            totals["cache_hits"] += record["engine"] == "cache"
+            totals["seconds"] += seconds
+            totals["passes"] += record.get("passes", 0)
+            totals["relaxations"] += record.get("relaxations", 0)
+            totals["cycle_check_seconds"] += record.get("cycle_check_seconds", 0.0)
+            self.last = record
+        for sink in self.sinks:
+            sink(record)
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self.totals)
+
+class JSONDumpSink:
+    """Instrumentation sink that appends records to a JSON-lines file
+
+    Records are buffered and written at most every interval seconds (and
+    on flush()/close()), so the file I/O stays off the per-query path.
+    """
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._buffer: List[Dict[str, object]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, object]):
+        with self._lock:
+            self._buffer.append(record)
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if records:
+                with open(self.path, "a") as f:
+                    f.writelines(json.dumps(r) + "\n" for r in records)
+
+    close = flush
+
+def format_stats(stats: Optional[Dict[str, object]]) -> str:
+    """One-line summary of a query's stats (last_stats or an instrumentation record)"""
+    if not stats:
+        return "No query yet"
+    parts = [f"{stats['engine']}/{stats.get('mode', '-')}"]
+    if stats["engine"] not in ("cache", "coalesced"):
+        parts.append(f"{stats.get('passes', 0)} passes")
+        if stats.get("early_exit_pass"):
+            parts[-1] += f" (early exit at pass {stats['early_exit_pass']})"
+        parts.append(f"{stats.get('relaxations', 0)} relaxations")
+    if "components" in stats:
+        parts.append(f"{stats['components']} components ({stats['cycle_checks']} cycle-checked)")
+    if stats.get("cycle_check_seconds") is not None:
+        parts.append(f"cycle check {stats['cycle_check_seconds'] * 1000:.2f} ms")
+    if stats.get("negative_cycle"):
+        parts.append("negative cycle")
+    if "seconds" in stats:
+        parts.append(f"{stats['seconds'] * 1000:.2f} ms total")
+    if "cache_hit_ratio" in stats:
+        parts.append(f"cache hit ratio {stats['cache_hit_ratio']:.0%}")
+    return ", ".join(parts)
 
 class Graph:
-    def __init__(self, V: int, E: int):
+    def __init__(self, V: int, E: int, cache_entries: Optional[int] = CACHE_MAX_ENTRIES,
+                 cache_bytes: Optional[int] = CACHE_MAX_BYTES):
         self.V = V
         self.E = E
-        self.edge = [Edge() for _ in range(E)]
-        self.distance_cache: Dict[int, List[int]] = {}
+        self.version = 0
+        self.negative_edges = 0
+        self.distance_cache = DistanceCache(cache_entries, cache_bytes)
+        self.inflight = SingleFlight()
+        self.instrumentation: Optional[Instrumentation] = None
+        self._edge: Optional[EdgeList] = EdgeList(self, [UNSET_EDGE] * E)
+        self._local = threading.local()
+        self._csr: Optional[CSR] = None
+        self._csr_version = -1
+        self._scc: Optional[SCCIndex] = None
+        self._scc_version = -1
+        self._yen: Dict[bool, Tuple[int, YenOrder]] = {}
+        self._snapshot: Optional[mmap.mmap] = None
 
-    def bellman_ford(self, src: int, city_names: List[str]) -> List[int]:
-        """Bellman-Ford with memoization"""
-        if src in self.distance_cache:
-            print(f"\nUsing cached result for source: {city_names[src]}")
-            return self.distance_cache[src]
+    @property
+    def edge(self) -> EdgeList:
+        """Edge objects; bulk-loaded graphs create them from the CSR (source order) on first use"""
+        if self._edge is None:
+            csr = self._csr
+            self._edge = EdgeList(self, map(Edge, csr.sources(), csr.targets, csr.weights))
+        return self._edge
 
-        dist = [sys.maxsize] * self.V
+    @edge.setter
+    def edge(self, edges: Iterable[Edge]):
+        self._edge = EdgeList(self, edges)
+        self.E = len(self._edge)
+        self.negative_edges = sum(1 for e in self._edge if e.weight < 0)
+        self.version += 1
+        self.distance_cache.invalidate(self.version)
+
+    def _edge_changed(self, old: "Edge", new: "Edge"):
+        """Keep derived graph facts in sync; Edge is immutable, so every change passes here"""
+        self.version += 1
+        self.distance_cache.invalidate(self.version)
+        if old is not None and old.weight < 0:
+            self.negative_edges -= 1
+        if new is not None and new.weight < 0:
+            self.negative_edges += 1
+
+    @property
+    def last_stats(self) -> Dict[str, object]:
+        """Counters of the calling thread's most recent query"""
+        return getattr(self._local, "stats", {})
+
+    @last_stats.setter
+    def last_stats(self, stats: Dict[str, object]):
+        self._local.stats = stats
+
+    @property
+    def has_negative_edges(self) -> bool:
+        return self.negative_edges > 0
+
+    def bellman_ford(self, src: int, city_names: List[str], engine: str = "auto",
+                     mode: str = "early_exit", progress=None) -> List[int]:
+        """Bellman-Ford with memoization
+
+        engine="auto" answers with Dijkstra while the graph has no negative
+        edge and falls back to the component-ordered Bellman-Ford ("scc", or
+        the plain pure-Python one for mode="queue") otherwise. engine="scc"
+        only visits components reachable from src, in topological order.
+        engine="yen" relaxes roads in alternating forward/backward sweeps over a
+        fixed city order (at most ceil(V / 2) passes), "yen_random" does the same
+        over a random permutation of the cities.
+        engine="numpy" relaxes all edges of a pass as one array operation.
+        mode="full" always runs V-1 passes, "early_exit" stops after a pass
+        with no update, "queue" (SPFA) only re-relaxes out-edges of vertices
+        whose distance changed. Counters for the run are left in last_stats
+        (and passed to self.instrumentation when one is attached).
+        Concurrent misses for the same source, engine and mode share one run.
+
+        progress(done, total) is called after every relaxation pass (every
+        V/100 settled cities for Dijkstra, every component for scc); raising
+        QueryCancelled from it aborts the query. Cancellable queries are
+        never shared with other callers.
+        """
+        if self.instrumentation is None:
+            return self._distances(src, engine, mode, progress)
+        start = time.perf_counter()
+        dist = self._distances(src, engine, mode, progress)
+        self.instrumentation.record(self, src, time.perf_counter() - start)
+        return dist
+
+    def shortest_path_tree(self, src: int, engine: str = "auto", mode: str = "early_exit",
+                           progress=None) -> Tuple[List[int], List[int]]:
+        """(dist, parent) from src; parent[v] is the city before v on its route (-1 if none)"""
+        if self.instrumentation is None:
+            return self._tree(src, engine, mode, progress)
+        start = time.perf_counter()
+        tree = self._tree(src, engine, mode, progress)
+        self.instrumentation.record(self, src, time.perf_counter() - start)
+        return tree
+
+    def _distances(self, src: int, engine: str, mode: str, progress=None) -> List[int]:
+        engine = self.resolve_engine(engine, mode)
+        cached = self.distance_cache.get(src)
+        if cached is not None:
+            self.last_stats = {"engine": "cache", "mode": mode, "passes": 0, "relaxations": 0,
+                               "negative_cycle": False}
+            return cached
+        return self._coalesced(src, engine, mode, progress)[0]
+
+    def _tree(self, src: int, engine: str, mode: str, progress=None) -> Tuple[List[int], List[int]]:
+        engine = self.resolve_engine(engine, mode)
+        cached = self.distance_cache.get_tree(src)
+        if cached is not None:
+            self.last_stats = {"engine": "cache", "mode": mode, "passes": 0, "relaxations": 0,
+                               "negative_cycle": False}
+            return cached
+        return self._coalesced(src, engine, mode, progress)
+
+    def shortest_path(self, src: int, dest: int, engine: str = "auto",
+                      mode: str = "early_exit") -> List[int]:
+        """Cities on the shortest route src -> dest ([] if unreachable), walked from the parent array"""
+        if not self.reachable(src, dest):
+            return []
+        _, parent = self.shortest_path_tree(src, engine, mode)
+        return path_from_parents(parent, src, dest)
+
+    def resolve_engine(self, engine: str, mode: str) -> str:
+        """The engine "auto" stands for on this graph and mode
+
+        Raises ValueError for an engine or mode that cannot run here, so the
+        answer does not depend on whether the result happens to be cached.
+        """
+        if mode not in RELAX_MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if engine == "auto":
+            if not self.has_negative_edges:
+                return "dijkstra"
+            return "python" if mode == "queue" else "scc"
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == "dijkstra" and self.has_negative_edges:
+            raise ValueError("Dijkstra cannot be used on a graph with negative edges")
+        if mode == "queue" and engine in ("numpy", "scc"):
+            raise ValueError(f"The {engine} engine supports only 'full' and 'early_exit' modes")
+        if mode == "queue" and engine in ("yen", "yen_random"):
+            raise ValueError("The yen engines support only 'full' and 'early_exit' modes")
+        return engine
+
+    def _coalesced(self, src: int, engine: str, mode: str, progress=None) -> Tuple[List[int], List[int]]:
+        """Cache miss: join an identical query already running on another thread, or run it"""
+        if progress is not None:
+            return self._shortest_paths(src, engine, mode, progress)
+        # Callers share a run only if it is the same engine (errors depend on it)
+        dist, parent, stats = self.inflight.do((self.version, src, engine, mode), self._solve, src, engine, mode)
+        if stats is not self.last_stats:
+            self.last_stats = {"engine": "coalesced", "mode": mode, "passes": 0, "relaxations": 0,
+                               "negative_cycle": stats["negative_cycle"]}
+        return dist, parent
+
+    def _solve(self, src: int, engine: str, mode: str) -> Tuple[List[int], List[int], Dict[str, object]]:
+        dist, parent = self._shortest_paths(src, engine, mode)
+        return dist, parent, self.last_stats
+
+    def _shortest_paths(self, src: int, engine: str, mode: str,
+                        progress=None) -> Tuple[List[int], List[int]]:
+        engine = self.resolve_engine(engine, mode)
+
+        if engine == "dijkstra":
+            dist, parent = self._dijkstra(src, progress)
+            negative_cycle = False
+        elif engine == "numpy":
+            dist, parent, negative_cycle = self._bellman_ford_numpy(src, mode, progress)
+        elif engine == "scc":
+            dist, parent, negative_cycle = self._bellman_ford_scc(src, mode, progress)
+        elif engine in ("yen", "yen_random"):
+            dist, parent, negative_cycle = self._bellman_ford_yen(src, mode, engine == "yen_random", progress)
+        elif mode == "queue":
+            dist, parent, negative_cycle = self._spfa(src, progress)
+        else:
+            dist, parent, negative_cycle = self._bellman_ford_python(src, mode, progress)
+
+        # Reported through last_stats; such a result is never cached
+        self.last_stats["negative_cycle"] = negative_cycle
+        if negative_cycle:
+            return dist, parent
+
+        self.distance_cache.put(src, dist.copy(), parent.copy())
+        return dist, parent
+
+    def batch_bellman_ford(self, sources: Iterable[int], engine: str = "auto", mode: str = "early_exit",
+                           processes: Optional[int] = None) -> Iterator[Tuple[int, List[int]]]:
+        """Answer many sources on a process pool, yielding (src, dist) as each finishes
+
+        Workers get the graph once, never per task: with fork they inherit
+        the CSR arrays copy-on-write, otherwise they mmap a snapshot of it.
+        Cached sources are yielded first without dispatching; fresh results
+        go into distance_cache (unless they hit a negative cycle).
+        """
+        pending = []
+        for src in dict.fromkeys(sources):
+            cached = self.distance_cache.get(src)
+            if cached is not None:
+                yield src, cached
+            else:
+                pending.append(src)
+        if not pending:
+            return
+
+        processes = min(processes or os.cpu_count() or 1, len(pending))
+        if processes <= 1:
+            for src in pending:
+                yield src, self.bellman_ford(src, None, engine, mode)
+            return
+
+        global _pool_graph
+        snapshot_path = None
+        import multiprocessing  # imported here so plain queries never load it
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+            self.csr()  # build once here so every child inherits it
+            _pool_graph = self
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            import tempfile
+            fd, snapshot_path = tempfile.mkstemp(suffix=".snap")
+            os.close(fd)
+            self.save_snapshot(snapshot_path, [])
+
+        tasks = [(src, engine, mode) for src in pending]
+        chunksize = max(1, len(tasks) // (processes * 8))
+        try:
+            with ctx.Pool(processes, _init_pool_worker, (snapshot_path,)) as pool:
+                for src, dist, parent, negative_cycle in pool.imap_unordered(_pool_query, tasks, chunksize):
+                    if not negative_cycle:
+                        self.distance_cache.put(src, dist.copy(), parent)
+                    yield src, dist
+        finally:
+            _pool_graph = None
+            if snapshot_path is not None:
+                os.remove(snapshot_path)
+
+    def _bellman_ford_python(self, src: int, mode: str, progress=None) -> Tuple[List[int], List[int], bool]:
+        csr = self.csr()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        INF = sys.maxsize
+        dist = [INF] * self.V
+        parent = [-1] * self.V
         dist[src] = 0
-        
+        passes = 0
+        relaxations = 0
+
         for _ in range(self.V - 1):
-            for j in range(self.E):
-                u = self.edge[j].src
-                v = self.edge[j].dest
-                w = self.edge[j].weight
-                if dist[u] != sys.maxsize and dist[u] + w < dist[v]:
-                    dist[v] = dist[u] + w
+            passes += 1
+            updated = False
+            for u in range(self.V):
+                du = dist[u]
+                if du == INF:
+                    continue  # nothing to relax out of an unreached city
+                a, b = offsets[u], offsets[u + 1]
+                relaxations += b - a
+                for v, w in zip(targets[a:b], weights[a:b]):
+                    if du + w < dist[v]:
+                        dist[v] = du + w
+                        parent[v] = u
+                        updated = True
+            if progress is not None:
+                progress(passes, self.V - 1)
+            if mode == "early_exit" and not updated:
+                # A pass without updates is a fixpoint, so no cycle check is needed
+                self.last_stats = {"engine": "python", "mode": mode, "passes": passes,
+                                   "relaxations": relaxations, "early_exit_pass": passes}
+                return dist, parent, False
+
+        # Check for negative cycles
+        start = time.perf_counter()
+        negative_cycle = False
+        for u in range(self.V):
+            du = dist[u]
+            if du == INF:
+                continue
+            for v, w in csr.out_edges(u):
+                if du + w < dist[v]:
+                    negative_cycle = True
+                    break
+            if negative_cycle:
+                break
+        self.last_stats = {"engine": "python", "mode": mode, "passes": passes,
+                           "relaxations": relaxations + self.E, "early_exit_pass": None,
+                           "cycle_check_seconds": time.perf_counter() - start}
+        return dist, parent, negative_cycle
+
+    def _spfa(self, src: int, progress=None) -> Tuple[List[int], List[int], bool]:
+        """Queue-based relaxation; a vertex enqueued V times means a negative cycle
+
+        Progress is reported once per V dequeued cities, the work of one pass.
+        """
+        csr = self.csr()
+
+        dist = [sys.maxsize] * self.V
+        parent = [-1] * self.V
+        dist[src] = 0
+        in_queue = [False] * self.V
+        enqueued = [0] * self.V
+        queue = deque([src])
+        in_queue[src] = True
+        enqueued[src] = 1
+        relaxations = 0
+        dequeued = 0
+
+        while queue:
+            u = queue.popleft()
+            in_queue[u] = False
+            if progress is not None:
+                dequeued += 1
+                if dequeued % self.V == 0:
+                    progress(min(dequeued // self.V, self.V - 1), self.V - 1)
+            du = dist[u]
+            for v, w in csr.out_edges(u):
+                relaxations += 1
+                if du + w < dist[v]:
+                    dist[v] = du + w
+                    parent[v] = u
+                    if not in_queue[v]:
+                        enqueued[v] += 1
+                        if enqueued[v] >= self.V:
+                            self.last_stats = {"engine": "python", "mode": "queue",
+                                               "passes": max(enqueued), "relaxations": relaxations}
+                            return dist, parent, True
+                        queue.append(v)
+                        in_queue[v] = True
+
+        self.last_stats = {"engine": "python", "mode": "queue",
+                           "passes": max(enqueued), "relaxations": relaxations}
+        return dist, parent, False
+
+    def _bellman_ford_scc(self, src: int, mode: str, progress=None) -> Tuple[List[int], List[int], bool]:
+        """Bellman-Ford one strongly connected component at a time
+
+        Components reachable from src are taken in topological order, so
+        every road into a component has its final distance when the
+        component starts: a city without a cycle needs one relaxation of its
+        roads, a cyclic component of k cities at most k - 1 passes over its
+        own roads. Only components with a negative road inside get the
+        extra negative-cycle pass. Unreachable cities are never touched.
+        progress(done, total) counts the reachable components finished.
+        """
+        if mode == "queue":
+            raise ValueError("The scc engine supports only 'full' and 'early_exit' modes")
+        csr = self.csr()
+        index = self.scc_index()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        comp, cyclic, negative = index.comp, index.cyclic, index.negative
+        INF = sys.maxsize
+        dist = [INF] * self.V
+        parent = [-1] * self.V
+        dist[src] = 0
+        reach = index.reach(comp[src])
+        total = bin(reach).count("1") if progress is not None else 0
+        components = max_passes = relaxations = checked = 0
+        cycle_seconds = 0.0
+
+        for c in range(comp[src], index.count):
+            if not reach >> c & 1:
+                continue
+            components += 1
+            members = index.members(c)
+            if not cyclic[c]:
+                u = members[0]
+                du = dist[u]
+                if du != INF:
+                    a, b = offsets[u], offsets[u + 1]
+                    relaxations += b - a
+                    for v, w in zip(targets[a:b], weights[a:b]):
+                        if du + w < dist[v]:
+                            dist[v] = du + w
+                            parent[v] = u
+                if progress is not None:
+                    progress(components, total)
+                continue
+
+            # Roads leaving the component are relaxed along with the inner
+            # ones; only inner updates keep the passes going
+            passes = 0
+            for _ in range(max(len(members) - 1, 1)):
+                passes += 1
+                updated = False
+                for u in members:
+                    du = dist[u]
+                    if du == INF:
+                        continue
+                    a, b = offsets[u], offsets[u + 1]
+                    relaxations += b - a
+                    for v, w in zip(targets[a:b], weights[a:b]):
+                        if du + w < dist[v]:
+                            dist[v] = du + w
+                            parent[v] = u
+                            if comp[v] == c:
+                                updated = True
+                if mode == "early_exit" and not updated:
+                    break
+            max_passes = max(max_passes, passes)
+            if updated:
+                # The last pass still moved the component: settle the roads
+                # leaving it. An inner road that still improves means a
+                # negative cycle, which needs a negative road inside.
+                start = time.perf_counter()
+                checked += negative[c]
+                relaxations += sum(offsets[u + 1] - offsets[u] for u in members)
+                for u in members:
+                    du = dist[u]
+                    if du == INF:
+                        continue
+                    for v, w in csr.out_edges(u):
+                        if du + w < dist[v]:
+                            if comp[v] == c:
+                                self.last_stats = {"engine": "scc", "mode": mode, "passes": max_passes + 1,
+                                                   "relaxations": relaxations, "components": components,
+                                                   "cycle_checks": checked,
+                                                   "cycle_check_seconds": time.perf_counter() - start}
+                                return dist, parent, True
+                            dist[v] = du + w
+                            parent[v] = u
+                if negative[c]:
+                    cycle_seconds += time.perf_counter() - start
+            if progress is not None:
+                progress(components, total)
+
+        self.last_stats = {"engine": "scc", "mode": mode, "passes": max_passes or 1,
+                           "relaxations": relaxations, "components": components,
+                           "cycle_checks": checked, "cycle_check_seconds": cycle_seconds}
+        return dist, parent, False
+
+    def _bellman_ford_yen(self, src: int, mode: str, randomized: bool = False,
+                          progress=None) -> Tuple[List[int], List[int], bool]:
+        """Yen's ordering: each pass sweeps forward roads in order, then backward roads in reverse
+
+        Counters match the plain engine (passes, relaxations, early-exit
+        pass, cycle-check time) so the two compare directly.
+        """
+        if mode == "queue":
+            raise ValueError("The yen engines support only 'full' and 'early_exit' modes")
+        yen = self.yen_order(randomized)
+        engine = "yen_random" if randomized else "yen"
+        order = yen.order
+        sweeps = ((range(self.V), yen.forward), (range(self.V - 1, -1, -1), yen.backward))
+        INF = sys.maxsize
+        dist = [INF] * self.V
+        parent = [-1] * self.V
+        dist[src] = 0
+        limit = max((self.V + 1) // 2, 1)  # ceil(V / 2) passes cover any route
+        passes = 0
+        relaxations = 0
+
+        for _ in range(limit):
+            passes += 1
+            updated = False
+            for rows, half in sweeps:
+                offsets, targets, weights = half.offsets, half.targets, half.weights
+                for i in rows:
+                    a, b = offsets[i], offsets[i + 1]
+                    if a == b:
+                        continue
+                    u = order[i]
+                    du = dist[u]
+                    if du == INF:
+                        continue
+                    relaxations += b - a
+                    for v, w in zip(targets[a:b], weights[a:b]):
+                        if du + w < dist[v]:
+                            dist[v] = du + w
+                            parent[v] = u
+                            updated = True
+            if progress is not None:
+                progress(passes, limit)
+            if mode == "early_exit" and not updated:
+                self.last_stats = {"engine": engine, "mode": mode, "passes": passes,
+                                   "relaxations": relaxations, "early_exit_pass": passes}
+                return dist, parent, False
 
         # Check for negative cycles
-        for j in range(self.E):
-            u = self.edge[j].src
-            v = self.edge[j].dest
-            w = self.edge[j].weight
+        start = time.perf_counter()
+        csr = self.csr()
+        negative_cycle = False
+        for u in range(self.V):
+            du = dist[u]
+            if du == INF:
+                continue
+            for v, w in csr.out_edges(u):
+                if du + w < dist[v]:
+                    negative_cycle = True
+                    break
+            if negative_cycle:
+                break
+        self.last_stats = {"engine": engine, "mode": mode, "passes": passes,
+                           "relaxations": relaxations + self.E, "early_exit_pass": None,
+                           "cycle_check_seconds": time.perf_counter() - start}
+        return dist, parent, negative_cycle
+
+    def add_edge(self, src: int, dest: int, weight: int) -> int:
+        """Append a road and repair every cached distance list; returns its index"""
+        cached = self.distance_cache.items()
+        self.edge.append(Edge(src, dest, weight))
+        self._repair_decrease(cached, src, dest, weight)
+        return self.E - 1
+
+    def update_weight(self, index: int, weight: int):
+        """Change the weight of road `index`, repairing cached distances in place
+
+        A decrease propagates improvements from the road's head only through
+        the part of each shortest-path tree that gets shorter; an increase
+        recomputes only the vertices whose tree hung off the road.
+        """
+        old = self.edge[index]
+        if weight == old.weight:
+            return
+        cached = self.distance_cache.items()
+        self.edge[index] = Edge(old.src, old.dest, weight)
+        if weight < old.weight:
+            self._repair_decrease(cached, old.src, old.dest, weight)
+        else:
+            self._repair_increase(cached, old.src, old.dest, old.weight)
+
+    def remove_edge(self, index: int):
+        """Delete road `index` (later roads shift down) and repair cached distances"""
+        old = self.edge[index]
+        cached = self.distance_cache.items()
+        del self.edge[index]
+        self._repair_increase(cached, old.src, old.dest, old.weight)
+
+    def _repair_decrease(self, cached: List[Tuple[int, List[int], Optional[List[int]]]],
+                         u: int, v: int, w: int):
+        """Re-relax from v after road u->v got cheaper; reaching u again means a negative cycle
+
+        The road can also lead a source into a negative cycle that was
+        unreachable before and does not pass through u; as in _spfa, a city
+        enqueued V times stops the repair. Either way the source's entry is
+        dropped instead of repaired.
+        """
+        csr = self.csr() if cached else None
+        relaxations = 0
+        negative_cycle = False
+
+        for src, old_dist, old_parent in cached:
+            dist = old_dist.copy()
+            # Distance-only entries still get a scratch parent array to keep the loop simple
+            parent = old_parent.copy() if old_parent is not None else [-1] * self.V
             if dist[u] != sys.maxsize and dist[u] + w < dist[v]:
-                print("\nWarning: Graph contains negative weight cycle!")
-                return dist
+                if u == v:
+                    negative_cycle = True
+                    continue
+                dist[v] = dist[u] + w
+                parent[v] = u
+                queue = deque([v])
+                in_queue = {v}
+                enqueued = {v: 1}
+                cycle = False
+                while queue and not cycle:
+                    x = queue.popleft()
+                    in_queue.discard(x)
+                    dx = dist[x]
+                    for y, wy in csr.out_edges(x):
+                        relaxations += 1
+                        if dx + wy < dist[y]:
+                            # Every improvement starts with u->v, so improving u closes a cycle
+                            if y == u:
+                                cycle = True
+                                break
+                            dist[y] = dx + wy
+                            parent[y] = x
+                            if y not in in_queue:
+                                enqueued[y] = enqueued.get(y, 0) + 1
+                                if enqueued[y] >= self.V:
+                                    cycle = True
+                                    break
+                                queue.append(y)
+                                in_queue.add(y)
+                if cycle:
+                    negative_cycle = True
+                    continue
+            self.distance_cache.put(src, dist, parent if old_parent is not None else None)
 
-        self.distance_cache[src] = dist.copy()
-        return dist
+        self.last_stats = {"engine": "repair", "mode": "decrease", "sources": len(cached),
+                           "relaxations": relaxations, "negative_cycle": negative_cycle}
 
-def save_results(dist: List[int], city_names: List[str], src: int):
-    """Save results to CSV files for visualization"""
-    # Save results
-    with open("route_results.csv", "w") as f:
-        f.write("Source,Destination,Distance\n")
-        for i in range(len(dist)):
-            distance = "INF" if dist[i] == sys.maxsize else str(dist[i])
-            f.write(f"{city_names[src]},{city_names[i]},{distance}\n")
+    def _repair_increase(self, cached: List[Tuple[int, List[int], Optional[List[int]]]],
+                         u: int, v: int, w_old: int):
+        """Recompute the subtree that hung off road u->v after it got dearer or was removed"""
+        csr = self.csr() if cached else None
+        rcsr = csr.transpose() if cached else None
+        INF = sys.maxsize
+        relaxations = 0
 
-def main():
-    try:
-        print("\n🌟 Bellman-Ford Shortest Path Calculator")
-        print("=" * 40)
-        
-        # Get input
-        V, E = map(int, input("\nEnter number of cities and roads (e.g., 4 5): ").split())
-        if V < 2 or E < 1:
-            raise ValueError("Need at least 2 cities and 1 road")
-            
-        graph = Graph(V, E)
-        city_names = []
+        for src, old_dist, old_parent in cached:
+            dist = old_dist.copy()
+            parent = old_parent.copy() if old_parent is not None else [-1] * self.V
+            stored_parent = parent if old_parent is not None else None
+            if (dist[u] == INF or dist[u] + w_old != dist[v] or v == src
+                    or (old_parent is not None and old_parent[v] != u)):
+                self.distance_cache.put(src, dist, stored_parent)
+                continue
 
-        print("\n📍 Enter city names:")
-        for i in range(V):
-            city = input(f"City {i + 1}: ").strip()
-            if not city:
-                raise ValueError("City name cannot be empty")
-            city_names.append(city)
+            # Vertices reachable from v over tight edges may have depended on u->v
+            affected = {v}
+            stack = [v]
+            while stack:
+                x = stack.pop()
+                for y, wy in csr.out_edges(x):
+                    if y not in affected and y != src and dist[x] + wy == dist[y]:
+                        affected.add(y)
+                        stack.append(y)
+            for x in affected:
+                dist[x] = INF
+                parent[x] = -1
 
-        print("\n🛣️ Enter roads as: SourceCity DestinationCity Distance")
-        print("Example: London Paris 350")
-        
-        # Save edges for visualization
-        with open("route_edges.csv", "w") as f:
-            f.write("Source,Destination,Weight\n")
-            
-            for i in range(E):
+            # Seed from unaffected in-neighbours, then relax inside the subtree
+            for y in affected:
+                for x, wx in rcsr.out_edges(y):
+                    relaxations += 1
+                    if x not in affected and dist[x] != INF and dist[x] + wx < dist[y]:
+                        dist[y] = dist[x] + wx
+                        parent[y] = x
+            queue = deque(y for y in affected if dist[y] != INF)
+            in_queue = set(queue)
+            while queue:
+                x = queue.popleft()
+                in_queue.discard(x)
+                dx = dist[x]
+                for y, wy in csr.out_edges(x):
+                    relaxations += 1
+                    if dx + wy < dist[y]:
+                        dist[y] = dx + wy
+                        parent[y] = x
+                        if y not in in_queue:
+                            queue.append(y)
+                            in_queue.add(y)
+            self.distance_cache.put(src, dist, stored_parent)
+
+        self.last_stats = {"engine": "repair", "mode": "increase", "sources": len(cached),
+                           "relaxations": relaxations, "negative_cycle": False}
+
+    @classmethod
+    def from_arrays(cls, V: int, srcs, dests, weights, **cache_limits) -> "Graph":
+        """Build a graph in one pass from parallel (src, dest, weight) sequences"""
+        csr = CSR.from_arrays(V, srcs, dests, weights)
+        return cls._from_csr(csr, sum(1 for w in weights if w < 0), **cache_limits)
+
+    @classmethod
+    def _from_csr(cls, csr: CSR, negative_edges: int, **cache_limits) -> "Graph":
+        # Edge objects are only created if someone asks for graph.edge
+        graph = cls(csr.V, 0, **cache_limits)
+        graph._edge = None
+        graph.E = csr.E
+        graph.negative_edges = negative_edges
+        graph.version += 1
+        graph.distance_cache.invalidate(graph.version)
+        graph._csr = csr
+        graph._csr_version = graph.version
+        return graph
+
+    def save_snapshot(self, path: str, city_names: List[str]):
+        """Write a binary snapshot: header, city-name table, then the CSR arrays
+
+        The file is written next to `path` and renamed into place, so readers
+        never see a half-written snapshot.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Snapshots are only supported on little-endian hosts")
+        csr = self.csr()
+        names = "\0".join(city_names).encode("utf-8")
+        chunks = [names, b"\0" * (-len(names) % 8),
+                  bytes(csr.offsets), bytes(csr.targets), bytes(csr.weights)]
+        fields = (self.V, self.E, self.negative_edges, len(names))
+        crc = zlib.crc32(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, 0, *fields))
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, crc, *fields))
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str, verify: bool = True, **cache_limits) -> Tuple["Graph", List[str]]:
+        """Map a snapshot written by save_snapshot; returns (graph, city_names)
+
+        The CSR arrays are read-only views of a shared mmap, so the graph is
+        usable without parsing and worker processes share the same pages.
+        A wrong magic/format, a size that does not match the header, or (with
+        verify) a checksum mismatch raises ValueError.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Snapshots are only supported on little-endian hosts")
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < SNAPSHOT_HEADER.size:
+                raise ValueError(f"Snapshot {path} is truncated")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, crc, V, E, negative_edges, names_len = SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a route graph snapshot")
+        if fmt != SNAPSHOT_FORMAT:
+            raise ValueError(f"Snapshot {path} has format {fmt}, expected {SNAPSHOT_FORMAT}")
+        names_end = SNAPSHOT_HEADER.size + names_len
+        offsets_at = names_end + (-names_len % 8)
+        targets_at = offsets_at + 8 * (V + 1)
+        weights_at = targets_at + 8 * E
+        if size != weights_at + 8 * E:
+            raise ValueError(f"Snapshot {path} is truncated or corrupt")
+
+        view = memoryview(mm)
+        # The checksum covers the header too: negative_edges is not implied by the size
+        header = SNAPSHOT_HEADER.pack(magic, fmt, 0, V, E, negative_edges, names_len)
+        if verify and zlib.crc32(view[SNAPSHOT_HEADER.size:], zlib.crc32(header)) != crc:
+            raise ValueError(f"Snapshot {path} failed its checksum")
+
+        city_names = bytes(view[SNAPSHOT_HEADER.size:names_end]).decode("utf-8").split("\0") if V else []
+        csr = CSR(V, view[offsets_at:targets_at].cast("q"), view[targets_at:weights_at].cast("q"),
+                  view[weights_at:].cast("q"))
+        graph = cls._from_csr(csr, negative_edges, **cache_limits)
+        graph._snapshot = mm
+        return graph, city_names
+
+    def csr(self) -> CSR:
+        """CSR view of the edge list, rebuilt only after the graph changed"""
+        if self._csr is None or self._csr_version != self.version:
+            edges = self.edge
+            self._csr = CSR.from_arrays(self.V, [e.src for e in edges], [e.dest for e in edges],
+                                        [e.weight for e in edges])
+            self._csr_version = self.version
+        return self._csr
+
+    def scc_index(self) -> SCCIndex:
+        """Component index of the current roads, rebuilt only after the graph changed"""
+        if self._scc is None or self._scc_version != self.version:
+            version = self.version
+            self._scc = SCCIndex(self.csr())
+            self._scc_version = version
+        return self._scc
+
+    def reachable(self, src: int, dest: int) -> bool:
+        """Whether any route leads from src to dest, from the component index"""
+        return self.scc_index().reachable(src, dest)
+
+    def yen_order(self, randomized: bool = False) -> YenOrder:
+        """Forward/backward road split for city-id order (or a YEN_SEED permutation), per graph version"""
+        version = self.version
+        cached = self._yen.get(randomized)
+        if cached is None or cached[0] != version:
+            order = list(range(self.V))
+            if randomized:
+                import random
+                random.Random(YEN_SEED).shuffle(order)
+            cached = self._yen[randomized] = (version, YenOrder(self.csr(), order))
+        return cached[1]
+
+    def _dijkstra(self, src: int, progress=None) -> Tuple[List[int], List[int]]:
+        """Binary-heap Dijkstra; only valid while no edge weight is negative"""
+        dist, parent, relaxations = dijkstra(self.csr(), src, progress)
+        self.last_stats = {"engine": "dijkstra", "mode": "heap", "passes": 1,
+                           "relaxations": relaxations}
+        return dist, parent
+
+    def all_pairs(self, with_predecessors: bool = False):
+        """All-pairs shortest paths with Johnson's algorithm
+
+        One Bellman-Ford from a virtual source gives potentials h, every edge
+        is reweighted to w + h[u] - h[v] >= 0, then Dijkstra runs from each
+        vertex. Returns the V x V distance matrix (sys.maxsize = unreachable),
+        plus the predecessor matrix (-1 = none) if with_predecessors is set.
+        Raises ValueError if the graph contains a negative weight cycle.
+        """
+        h = self.potentials()
+        csr = self.csr().reweighted(h)
+
+        dist_matrix: List[List[int]] = []
+        pred_matrix: List[List[int]] = []
+        for src in range(self.V):
+            dist, parent, _ = dijkstra(csr, src)
+            hs = h[src]
+            row = [d if d == sys.maxsize else d - hs + h[v] for v, d in enumerate(dist)]
+            dist_matrix.append(row)
+            pred_matrix.append(parent)
+            self.distance_cache.put(src, row.copy(), parent.copy())
+
+        if with_predecessors:
+            return dist_matrix, pred_matrix
+        return dist_matrix
+
+    def potentials(self) -> List[int]:
+        """Johnson potentials: distances from a virtual source with a 0-edge to every vertex"""
+        h = [0] * self.V
+        if not self.has_negative_edges:
+            return h
+
+        # The virtual source adds one vertex, so V passes are needed
+        csr = self.csr()
+        for _ in range(self.V):
+            updated = False
+            for u in range(self.V):
+                hu = h[u]
+                for v, w in csr.out_edges(u):
+                    if hu + w < h[v]:
+                        h[v] = hu + w
+                        updated = True
+            if not updated:
+                return h
+        raise ValueError("Graph contains negative weight cycle")
+
+    def dense_matrix(self) -> List[List[int]]:
+        """V x V weight matrix (cheapest parallel edge, sys.maxsize = no road)"""
+        matrix = [[sys.maxsize] * self.V for _ in range(self.V)]
+        for i in range(self.V):
+            matrix[i][i] = 0
+        csr = self.csr()
+        for u in range(self.V):
+            row = matrix[u]
+            for v, w in csr.out_edges(u):
+                if w < row[v]:
+                    row[v] = w
+        return matrix
+
+    def floyd_warshall(self, block_size: int = FW_BLOCK_SIZE) -> Tuple[List[List[int]], List[List[int]]]:
+        """All-pairs distances and next hops for dense graphs; fills distance_cache"""
+        dist, next_hop = floyd_warshall(self.dense_matrix(), block_size)
+        for src in range(self.V):
+            self.distance_cache.put(src, dist[src].copy())
+        return dist, next_hop
+
+    def edge_arrays(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Edges as parallel (src, dest, weight) int64 arrays, grouped by source
+
+        dest and weight are zero-copy views of the CSR arrays.
+        """
+        if optional_numpy() is None:
+            raise ImportError("numpy is required for the vectorized engine")
+        csr = self.csr()
+        offsets = np.frombuffer(csr.offsets, dtype=np.int64)
+        srcs = np.repeat(np.arange(self.V, dtype=np.int64), np.diff(offsets))
+        dests = np.frombuffer(csr.targets, dtype=np.int64)
+        weights = np.frombuffer(csr.weights, dtype=np.int64)
+        return srcs, dests, weights
+
+    def _bellman_ford_numpy(self, src: int, mode: str, progress=None) -> Tuple[List[int], List[int], bool]:
+        """Each pass gathers dist[src] + weight and scatter-mins it into dist[dest]
+
+        The parent of a city is taken from an edge that strictly improved it
+        in the pass it last changed, which keeps the parent array a tree.
+        """
+        if mode == "queue":
+            raise ValueError("The numpy engine supports only 'full' and 'early_exit' modes")
+        srcs, dests, weights = self.edge_arrays()
+        INF = sys.maxsize
+
+        def relax_candidates(dist):
+            base = dist[srcs]
+            reachable = base != INF
+            cand = np.full(self.E, INF, dtype=np.int64)
+            cand[reachable] = base[reachable] + weights[reachable]
+            return cand
+
+        dist = np.full(self.V, INF, dtype=np.int64)
+        parent = np.full(self.V, -1, dtype=np.int64)
+        dist[src] = 0
+        passes = 0
+
+        for _ in range(self.V - 1):
+            passes += 1
+            before = dist.copy()
+            cand = relax_candidates(dist)
+            np.minimum.at(dist, dests, cand)
+            improved = (cand < before[dests]) & (cand == dist[dests])
+            parent[dests[improved]] = srcs[improved]
+            if progress is not None:
+                progress(passes, self.V - 1)
+            if mode == "early_exit" and not improved.any():
+                self.last_stats = {"engine": "numpy", "mode": mode, "passes": passes,
+                                   "relaxations": passes * self.E, "early_exit_pass": passes}
+                return dist.tolist(), parent.tolist(), False
+
+        # Check for negative cycles
+        start = time.perf_counter()
+        negative_cycle = bool(np.any(relax_candidates(dist) < dist[dests]))
+        self.last_stats = {"engine": "numpy", "mode": mode, "passes": passes,
+                           "relaxations": (passes + 1) * self.E, "early_exit_pass": None,
+                           "cycle_check_seconds": time.perf_counter() - start}
+        return dist.tolist(), parent.tolist(), negative_cycle
+
+# Graph handed to forked pool workers (inherited, not pickled) and the
+# per-worker view of it built by _init_pool_worker
+_pool_graph: Optional[Graph] = None
+_worker_graph: Optional[Graph] = None
+
+def _init_pool_worker(snapshot_path: Optional[str]):
+    global _worker_graph
+    if snapshot_path is None:
+        parent = _pool_graph
+        _worker_graph = Graph._from_csr(parent.csr(), parent.negative_edges, cache_entries=0)
+    else:
+        _worker_graph, _ = Graph.load_snapshot(snapshot_path, verify=False, cache_entries=0)
+
+def _pool_query(task: Tuple[int, str, str]) -> Tuple[int, List[int], List[int], bool]:
+    src, engine, mode = task
+    dist, parent = _worker_graph.shortest_path_tree(src, engine, mode)
+    return src, dist, parent, _worker_graph.last_stats["negative_cycle"]
+
+def load_edges_csv(path: str, max_errors: int = LOAD_MAX_ERRORS) -> Tuple[Graph, List[str], List[str]]:
+    """Stream a Source,Destination,Weight file (optionally .gz) into a Graph
+
+    City names are interned into a dict as they appear, so ids follow first
+    appearance. Rows are parsed as they are read and only the int arrays are
+    kept. Malformed rows are skipped and reported (at most max_errors
+    messages) instead of aborting. Returns (graph, city_names, errors).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    city_index: Dict[str, int] = {}
+    city_names: List[str] = []
+    srcs, dests, weights = array("q"), array("q"), array("q")
+    errors: List[str] = []
+    bad_rows = 0
+
+    with opener(path, "rb") as raw:
+        text = io.TextIOWrapper(io.BufferedReader(raw, LOAD_BUFFER_SIZE), encoding="utf-8", newline="")
+        for line_no, row in enumerate(csv.reader(text), start=1):
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            problem = None
+            if len(row) != 3:
+                problem = f"expected 3 fields, got {len(row)}"
+            else:
+                src, dest, weight = row[0].strip(), row[1].strip(), row[2].strip()
                 try:
-                    src, dest, weight = input(f"Road {i + 1}: ").split()
-                    weight = int(weight)
-                    
-                    try:
-                        src_idx = city_names.index(src)
-                        dest_idx = city_names.index(dest)
-                    except ValueError:
-                        print(f"Error: City '{src}' or '{dest}' not found!")
-                        continue
-                        
-                    graph.edge[i] = Edge(src_idx, dest_idx, weight)
-                    f.write(f"{src},{dest},{weight}\n")
-                    
+                    w = int(weight)
                 except ValueError:
-                    print("Error: Invalid input format! Use: City1 City2 Distance")
+                    if line_no == 1:
+                        continue  # header
+                    problem = f"weight '{weight}' is not an integer"
+                else:
+                    if not src or not dest:
+                        problem = "empty city name"
+            if problem:
+                bad_rows += 1
+                if len(errors) < max_errors:
+                    errors.append(f"line {line_no}: {problem}")
+                continue
+
+            for name in (src, dest):
+                if name not in city_index:
+                    city_index[name] = len(city_names)
+                    city_names.append(name)
+            srcs.append(city_index[src])
+            dests.append(city_index[dest])
+            weights.append(w)
+
+    if bad_rows > len(errors):
+        errors.append(f"... and {bad_rows - len(errors)} more malformed rows")
+    return Graph.from_arrays(len(city_names), srcs, dests, weights), city_names, errors
+
+class Road:
+    """One editable row of an EdgeStore: raw text plus its parsed value"""
+    __slots__ = ("text", "edge", "error", "dirty")
+
+    def __init__(self, src: str = "", dest: str = "", weight: str = ""):
+        self.text = [src, dest, weight]
+        self.edge: Optional[Tuple[str, str, int]] = None
+        self.error: Optional[str] = None
+        self.dirty = True
+
+    def parse(self):
+        src, dest, weight = (t.strip() for t in self.text)
+        self.edge, self.error, self.dirty = None, None, False
+        if not weight or weight.upper() == "INF":
+            if bool(src) != bool(dest):
+                self.error = "empty city name"
+            return  # no direct road
+        try:
+            w = int(weight)
+        except ValueError:
+            self.error = f"weight '{weight}' is not an integer"
+            return
+        if not src or not dest:
+            self.error = "empty city name"
+            return
+        self.edge = (src, dest, w)
+
+class EdgeStore:
+    """In-memory road table behind the GUI road editor
+
+    Rows keep the text as typed; editing a row only marks that row, and
+    parse() re-parses just the marked rows. graph() builds a Graph over the
+    base cities plus every new city named by a valid row (in order of first
+    appearance) and caches it until the next edit. Blank or INF weights
+    mean "no direct road", as in the old distance matrix.
+    """
+    def __init__(self, city_names: Iterable[str] = ()):
+        self.base_names: List[str] = list(city_names)
+        self.rows: List[Road] = []
+        self.version = 0
+        self._dirty: List[Road] = []
+        self._graph: Optional[Graph] = None
+        self._graph_version = -1
+        self._city_names: List[str] = list(self.base_names)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _changed(self, road: Optional[Road] = None):
+        self.version += 1
+        if road is not None and not road.dirty:
+            road.dirty = True
+            self._dirty.append(road)
+
+    def reset(self, city_names: Iterable[str] = ()):
+        self.base_names = list(city_names)
+        self.rows = []
+        self._dirty = []
+        self._changed()
+
+    def append(self, src: str = "", dest: str = "", weight: str = "") -> int:
+        road = Road(str(src), str(dest), str(weight))
+        self.rows.append(road)
+        self._dirty.append(road)
+        self._changed()
+        return len(self.rows) - 1
+
+    def extend(self, rows: Iterable[Tuple[str, str, str]]):
+        new = [Road(str(a), str(b), str(c)) for a, b, c in rows]
+        self.rows.extend(new)
+        self._dirty.extend(new)
+        self._changed()
+
+    def delete(self, index: int):
+        road = self.rows.pop(index)
+        road.dirty = False  # skipped if still queued for parsing
+        self._changed()
+
+    def text(self, index: int) -> List[str]:
+        return self.rows[index].text
+
+    def set_cell(self, index: int, column: int, value: str) -> bool:
+        """Store the text of one cell; returns whether it changed"""
+        road = self.rows[index]
+        if road.text[column] == value:
+            return False
+        road.text[column] = value
+        self._changed(road)
+        return True
+
+    def load_csv(self, path: str) -> int:
+        """Append the rows of a Source,Destination,Weight file (header optional); returns the count"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            rows = [row + [""] * (3 - len(row)) for row in csv.reader(f)
+                    if row and any(cell.strip() for cell in row)]
+        if rows and [c.strip().lower() for c in rows[0][:3]] == ["source", "destination", "weight"]:
+            rows = rows[1:]
+        self.extend(row[:3] for row in rows)
+        return len(rows)
+
+    def parse(self) -> List[Tuple[int, str]]:
+        """Parse the rows edited since the last call; returns (row, problem) for every bad row"""
+        for road in self._dirty:
+            if road.dirty:
+                road.parse()
+        self._dirty = []
+        return [(i, road.error) for i, road in enumerate(self.rows) if road.error]
+
+    def edges(self) -> Iterator[Tuple[str, str, int]]:
+        self.parse()
+        return (road.edge for road in self.rows if road.edge is not None)
+
+    def graph(self) -> Tuple[Graph, List[str]]:
+        """(graph, city_names) for the current rows, rebuilt only after an edit"""
+        if self._graph is None or self._graph_version != self.version:
+            city_index: Dict[str, int] = {}
+            for name in self.base_names:
+                city_index.setdefault(name, len(city_index))
+            srcs, dests, weights = array("q"), array("q"), array("q")
+            for src, dest, w in self.edges():
+                srcs.append(city_index.setdefault(src, len(city_index)))
+                dests.append(city_index.setdefault(dest, len(city_index)))
+                weights.append(w)
+            self._city_names = list(city_index)
+            self._graph = Graph.from_arrays(len(city_index), srcs, dests, weights)
+            self._graph_version = self.version
+        return self._graph, self._city_names
+
+def dijkstra(csr: CSR, src: int, progress=None) -> Tuple[List[int], List[int], int]:
+    """Binary-heap Dijkstra over a CSR graph; returns (dist, parent, relaxations)
+
+    progress(settled, V) is called every V/100 settled cities and once at
+    the end; raising QueryCancelled from it aborts the run.
+    """
+    dist = [sys.maxsize] * csr.V
+    parent = [-1] * csr.V
+    dist[src] = 0
+    heap = [(0, src)]
+    relaxations = 0
+    settled = 0
+    step = max(csr.V // 100, 1)
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if progress is not None:
+            settled += 1
+            if settled % step == 0:
+                progress(settled, csr.V)
+        for v, w in csr.out_edges(u):
+            relaxations += 1
+            if d + w < dist[v]:
+                dist[v] = d + w
+                parent[v] = u
+                heapq.heappush(heap, (d + w, v))
+
+    if progress is not None:
+        progress(csr.V, csr.V)  # unreachable cities are never settled
+    return dist, parent, relaxations
+
+def floyd_warshall(matrix, block_size: int = FW_BLOCK_SIZE) -> Tuple[List[List[int]], List[List[int]]]:
+    """Floyd-Warshall on a dense V x V weight matrix
+
+    Missing roads are sys.maxsize, float('inf') or None. Returns (dist,
+    next_hop) where next_hop[i][j] is the first city after i on the route to
+    j (-1 if unreachable). With numpy the matrix is updated as whole
+    rows/columns per k, tiled into block_size x block_size blocks so large V
+    stays in cache; distances stay int64 (sys.maxsize = unreachable), so they
+    are exact like the pure-Python ones. Raises ValueError on a negative
+    weight cycle (negative diagonal).
+    """
+    V = len(matrix)
+    if optional_numpy() is None:
+        return _floyd_warshall_python(matrix)
+    INF = sys.maxsize
+
+    W = np.array([[INF if w is None or w >= INF else w for w in row] for row in matrix],
+                 dtype=np.int64).reshape(V, V)
+    D = W.copy()
+    np.fill_diagonal(D, np.minimum(np.diag(W), 0))
+    # Hop counts break ties, so every route is lexicographically (distance, hops) minimal
+    H = np.where(D != INF, 1, INF)
+    np.fill_diagonal(H, 0)
+
+    blocks = [slice(b, min(b + block_size, V)) for b in range(0, V, block_size)]
+    for kb in blocks:
+        ks = range(kb.start, kb.stop)
+        # Phase 1: diagonal block, then 2: its block row and column, then 3: the rest
+        _fw_update(D, H, kb, kb, ks)
+        for b in blocks:
+            if b != kb:
+                _fw_update(D, H, kb, b, ks)
+                _fw_update(D, H, b, kb, ks)
+        for bi in blocks:
+            if bi == kb:
+                continue
+            for bj in blocks:
+                if bj != kb:
+                    _fw_update(D, H, bi, bj, ks)
+
+    if np.any(np.diag(D) < 0):
+        raise ValueError("Graph contains negative weight cycle")
+
+    # The next hop is an out-neighbour n with w(i, n) + D[n, j] == D[i, j] one hop
+    # closer to j; hops strictly decrease along the route, so it cannot loop.
+    next_hop = np.full((V, V), -1, dtype=np.int64)
+    not_self = np.arange(V)
+    for i in range(V):
+        nbrs = np.nonzero((W[i] != INF) & (not_self != i))[0]
+        if nbrs.size:
+            tight = ((D[nbrs] != INF) & (W[i, nbrs][:, None] + D[nbrs] == D[i][None, :])
+                     & (H[nbrs] + 1 == H[i][None, :]))
+            found = tight.any(axis=0) & (D[i] != INF)
+            next_hop[i, found] = nbrs[tight.argmax(axis=0)[found]]
+        next_hop[i, i] = i
+
+    return D.tolist(), next_hop.tolist()
+
+def _fw_update(D, H, rows: slice, cols: slice, ks):
+    """Relax block D[rows, cols] through every intermediate k in ks
+
+    Sums are only formed where both halves are reachable, so the
+    sys.maxsize sentinel never overflows into a real distance.
+    """
+    INF = sys.maxsize
+    sub = D[rows, cols]
+    hops = H[rows, cols]
+    cand = np.empty_like(sub)
+    cand_hops = np.empty_like(hops)
+    for k in ks:
+        d_ik = D[rows, k][:, None]
+        d_kj = D[k, cols][None, :]
+        reach = (d_ik != INF) & (d_kj != INF)
+        cand.fill(INF)
+        np.add(d_ik, d_kj, out=cand, where=reach)
+        cand_hops.fill(INF)
+        np.add(H[rows, k][:, None], H[k, cols][None, :], out=cand_hops, where=reach)
+        better = (cand < sub) | ((cand == sub) & (cand_hops < hops))
+        if better.any():
+            sub[better] = cand[better]
+            hops[better] = cand_hops[better]
+
+def _floyd_warshall_python(matrix) -> Tuple[List[List[int]], List[List[int]]]:
+    V = len(matrix)
+    INF = sys.maxsize
+    dist = [[INF if w is None or w >= INF else w for w in row] for row in matrix]
+    for i in range(V):
+        dist[i][i] = min(dist[i][i], 0)
+    next_hop = [[j if dist[i][j] != INF else -1 for j in range(V)] for i in range(V)]
+
+    for k in range(V):
+        row_k = dist[k]
+        for i in range(V):
+            d_ik = dist[i][k]
+            if d_ik == INF:
+                continue
+            row_i = dist[i]
+            hop_i = next_hop[i]
+            hop_ik = hop_i[k]
+            for j in range(V):
+                if row_k[j] != INF and d_ik + row_k[j] < row_i[j]:
+                    row_i[j] = d_ik + row_k[j]
+                    hop_i[j] = hop_ik
+
+    if any(dist[i][i] < 0 for i in range(V)):
+        raise ValueError("Graph contains negative weight cycle")
+    return dist, next_hop
+
+def path_from_parents(parent: List[int], src: int, dest: int) -> List[int]:
+    """Walk parent pointers back from dest in O(path length); [] if dest is not reached"""
+    path = [dest]
+    while path[-1] != src:
+        prev = parent[path[-1]]
+        if prev < 0 or len(path) > len(parent):
+            return []
+        path.append(prev)
+    path.reverse()
+    return path
+
+def path_from_next_hop(next_hop: List[List[int]], src: int, dest: int) -> List[int]:
+    """Follow a Floyd-Warshall next-hop matrix from src to dest; [] if unreachable"""
+    if next_hop[src][dest] < 0:
+        return []
+    path = [src]
+    while path[-1] != dest and len(path) <= len(next_hop):
+        path.append(next_hop[path[-1]][dest])
+    return path
+
+class ResultWriter:
+    """Streams distance rows for many sources into one file, or one file per source
+
+    fmt="csv" writes Source,Destination,Distance rows (INF if unreachable),
+    fmt="bin" a header with the city names followed by one record per
+    source: its index and all V distances as little-endian int64
+    (sys.maxsize if unreachable), readable with read_results(). Each write()
+    hands one source's rows to a large write buffer, so a V x V table never
+    has to be in memory at once.
+
+    With partition=True, path is a directory and source i goes to
+    source_<i>.csv / .bin in it. Otherwise append=True adds to an existing
+    file (a binary file must be for the same number of cities) instead of
+    truncating it.
+    """
+    def __init__(self, path: str, city_names: List[str], fmt: str = "csv", partition: bool = False,
+                 append: bool = False, buffer_size: int = LOAD_BUFFER_SIZE):
+        if fmt not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {fmt}")
+        if fmt == "bin" and sys.byteorder != "little":
+            raise ValueError("Binary results are only supported on little-endian hosts")
+        self.path = path
+        self.city_names = city_names
+        self.fmt = fmt
+        self.partition = partition
+        self.buffer_size = buffer_size
+        self.sources = 0
+        self._file = None
+        if partition:
+            os.makedirs(path, exist_ok=True)
+        else:
+            self._file = self._open(path, append)
+
+    def _open(self, path: str, append: bool):
+        f = open(path, "ab" if append else "wb", buffering=self.buffer_size)
+        if f.tell() == 0:
+            self._write_header(f)
+        elif self.fmt == "bin":
+            with open(path, "rb") as existing:
+                header = existing.read(RESULTS_HEADER.size)
+            magic, fmt, V, _ = RESULTS_HEADER.unpack(header)
+            if magic != RESULTS_MAGIC or fmt != RESULTS_FORMAT or V != len(self.city_names):
+                f.close()
+                raise ValueError(f"{path} is not a results file for {len(self.city_names)} cities")
+        return f
+
+    def _write_header(self, f):
+        if self.fmt == "csv":
+            f.write(b"Source,Destination,Distance\n")
+        else:
+            names = "\0".join(self.city_names).encode("utf-8")
+            f.write(RESULTS_HEADER.pack(RESULTS_MAGIC, RESULTS_FORMAT, len(self.city_names), len(names)))
+            f.write(names + b"\0" * (-len(names) % 8))
+
+    def write(self, src: int, dist) -> None:
+        """Add the distances from src (a list or int64 array of length V)"""
+        if len(dist) != len(self.city_names):
+            raise ValueError(f"Expected {len(self.city_names)} distances, got {len(dist)}")
+        if self.partition:
+            f = self._open(os.path.join(self.path, f"source_{src}.{self.fmt}"), False)
+        else:
+            f = self._file
+        if self.fmt == "csv":
+            text = io.StringIO()
+            csv.writer(text, lineterminator="\n").writerows(
+                zip(repeat(self.city_names[src]), self.city_names,
+                    ["INF" if d == sys.maxsize else d for d in dist]))
+            f.write(text.getvalue().encode("utf-8"))
+        else:
+            f.write(RESULTS_SOURCE.pack(src))
+            f.write(dist if isinstance(dist, array) and dist.typecode == "q" else array("q", dist))
+        if self.partition:
+            f.close()
+        self.sources += 1
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_results(path: str) -> Tuple[List[str], Iterator[Tuple[int, array]]]:
+    """Open a binary results file; returns (city_names, iterator of (src, distances))
+
+    Records are read one at a time, so the whole table is never loaded.
+    """
+    f = open(path, "rb")
+    header = f.read(RESULTS_HEADER.size)
+    if len(header) < RESULTS_HEADER.size:
+        f.close()
+        raise ValueError(f"Results file {path} is truncated")
+    magic, fmt, V, names_len = RESULTS_HEADER.unpack(header)
+    if magic != RESULTS_MAGIC or fmt != RESULTS_FORMAT:
+        f.close()
+        raise ValueError(f"{path} is not a binary results file")
+    names = f.read(names_len + (-names_len % 8))[:names_len]
+    city_names = names.decode("utf-8").split("\0") if V else []
+
+    def records():
+        with f:
+            while True:
+                head = f.read(RESULTS_SOURCE.size)
+                if not head:
                     return
+                dist = array("q")
+                try:
+                    dist.fromfile(f, V)
+                except EOFError:
+                    raise ValueError(f"Results file {path} is truncated")
+                yield RESULTS_SOURCE.unpack(head)[0], dist
 
-        while True:
-            src_city = input("\nEnter source city (or 'quit' to exit): ").strip()
-            if src_city.lower() == 'quit':
-                break
+    return city_names, records()
+
+def export_results(graph: Graph, city_names: List[str], path: str, sources: Optional[Iterable[int]] = None,
+                   fmt: str = "csv", partition: bool = False, processes: Optional[int] = None) -> int:
+    """Write the distances from every source (default: all cities) as they are computed
+
+    Uses batch_bellman_ford, so sources run on a process pool and results
+    are written in completion order. Returns the number of sources written.
+    """
+    if sources is None:
+        sources = range(graph.V)
+    with ResultWriter(path, city_names, fmt, partition) as writer:
+        for src, dist in graph.batch_bellman_ford(sources, processes=processes):
+            writer.write(src, dist)
+        return writer.sources
+
+def save_results(dist: List[int], city_names: List[str], src: int, path: str = RESULTS_PATH):
+    """Save one source's results to a fresh CSV file (see ResultWriter for many sources)"""
+    with ResultWriter(path, city_names) as writer:
+        writer.write(src, dist)
+
+def read_graph_interactive() -> Tuple[Graph, List[str]]:
+    """Prompt for cities and roads; roads are also saved to route_edges.csv"""
+    V, E = map(int, input("\nEnter number of cities and roads (e.g., 4 5): ").split())
+    if V < 2 or E < 1:
+        raise ValueError("Need at least 2 cities and 1 road")
+        
+    graph = Graph(V, E)
+    city_names = []
+    city_index = {}
 
+    print("\n📍 Enter city names:")
+    for i in range(V):
+        city = input(f"City {i + 1}: ").strip()
+        if not city:
+            raise ValueError("City name cannot be empty")
+        city_names.append(city)
+        city_index.setdefault(city, i)
+
+    print("\n🛣️ Enter roads as: SourceCity DestinationCity Distance")
+    print("Example: London Paris 350")
+    
+    # Save edges for visualization
+    with open("route_edges.csv", "w") as f:
+        f.write("Source,Destination,Weight\n")
+        
+        for i in range(E):
             try:
-                src_idx = city_names.index(src_city)
+                src, dest, weight = input(f"Road {i + 1}: ").split()
+                weight = int(weight)
+                
+                src_idx = city_index.get(src)
+                dest_idx = city_index.get(dest)
+                if src_idx is None or dest_idx is None:
+                    print(f"Error: City '{src}' or '{dest}' not found!")
+                    continue
+                    
+                graph.edge[i] = Edge(src_idx, dest_idx, weight)
+                f.write(f"{src},{dest},{weight}\n")
+                
             except ValueError:
-                print("Error: City not found!")
-                continue
+                raise ValueError("Invalid input format! Use: City1 City2 Distance")
 
-            # Run algorithm
-            distances = graph.bellman_ford(src_idx, city_names)
-            
-            # Print results
-            print("\nShortest Distances:")
-            print("-" * 30)
-            for i, dist in enumerate(distances):
-                if dist == sys.maxsize:
-                    print(f"{city_names[i]:<15} : INF")
-                else:
-                    print(f"{city_names[i]:<15} : {dist}")
+    return graph, city_names
+
+def load_graph(path: str) -> Tuple[Graph, List[str], List[str]]:
+    """A snapshot (.snap) or a Source,Destination,Weight CSV; returns (graph, city_names, errors)"""
+    if path.endswith(".snap"):
+        graph, city_names = Graph.load_snapshot(path)
+        return graph, city_names, []
+    return load_edges_csv(path)
+
+def read_queries(lines: Iterable[str]) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """(line number, source, destination or None) from "Source[,Destination]" lines
+
+    Blank lines, # comments and a Source,Destination header are skipped.
+    """
+    for line_no, row in enumerate(csv.reader(lines), start=1):
+        fields = [field.strip() for field in row]
+        if not fields or not fields[0] or fields[0].startswith("#"):
+            continue
+        if line_no == 1 and fields[0].lower() == "source":
+            continue
+        yield line_no, fields[0], fields[1] if len(fields) > 1 and fields[1] else None
 
-            # Save results for visualization
-            save_results(distances, city_names, src_idx)
-            print("\n✅ Results saved for visualization")
-            print("Run 'python Route_Visualizer.py' to see the graph")
+def run_batch(graph: Graph, city_names: List[str], queries: Iterable[str], out,
+              fmt: str = "jsonl", engine: str = "auto", mode: str = "early_exit") -> Dict[str, object]:
+    """Answer each query line as it is read and write one result per query to out (a text stream)
+
+    jsonl writes {"source", "destination", "distance", "path"} for a
+    source/destination pair and {"source", "distances"} for a bare source,
+    with null for unreachable cities, or {"line", "error"} for a query that
+    cannot be answered. csv writes Source,Destination,Distance rows (INF if
+    unreachable, every city for a bare source) and reports failed queries
+    on stderr. Repeated sources are answered from the distance cache.
+    Returns the query, error and timing counters.
+    """
+    if fmt not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format: {fmt}")
+    city_index: Dict[str, int] = {}
+    for i, name in enumerate(city_names):
+        city_index.setdefault(name, i)
+    writer = csv.writer(out, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(("Source", "Destination", "Distance"))
+    answered = failed = 0
+    start = time.perf_counter()
+
+    for line_no, src_name, dest_name in read_queries(queries):
+        src = city_index.get(src_name)
+        dest = city_index.get(dest_name) if dest_name is not None else None
+        if src is None or (dest_name is not None and dest is None):
+            error = f"Unknown city: {src_name if src is None else dest_name}"
+        else:
+            try:
+                dist, parent = graph.shortest_path_tree(src, engine, mode)
+            except ValueError as e:  # engine/mode the graph cannot run, e.g. dijkstra with negative roads
+                error = str(e)
+            else:
+                error = "Graph contains negative weight cycle" if graph.last_stats["negative_cycle"] else None
+        if error:
+            failed += 1
+            if fmt == "jsonl":
+                out.write(json.dumps({"line": line_no, "error": error}) + "\n")
+            else:
+                print(f"line {line_no}: {error}", file=sys.stderr)
+            continue
+
+        answered += 1
+        if fmt == "csv":
+            if dest is None:
+                writer.writerows(zip(repeat(src_name), city_names,
+                                     ["INF" if d == sys.maxsize else d for d in dist]))
+            else:
+                writer.writerow((src_name, dest_name, "INF" if dist[dest] == sys.maxsize else dist[dest]))
+        elif dest is None:
+            out.write(json.dumps({"source": src_name, "distances": {
+                name: None if d == sys.maxsize else d for name, d in zip(city_names, dist)}}) + "\n")
+        else:
+            out.write(json.dumps({"source": src_name, "destination": dest_name,
+                                  "distance": None if dist[dest] == sys.maxsize else dist[dest],
+                                  "path": [city_names[v] for v in path_from_parents(parent, src, dest)]}) + "\n")
+
+    seconds = time.perf_counter() - start
+    return {"queries": answered + failed, "answered": answered, "errors": failed, "seconds": seconds,
+            "queries_per_second": (answered + failed) / seconds if seconds > 0 else 0.0,
+            "cache": graph.distance_cache.stats()}
+
+def batch_main(argv: List[str]) -> int:
+    """python Route_Backend.py batch <graph.csv|graph.snap> [queries|-] [-o results] [--format csv]"""
+    import argparse
+    parser = argparse.ArgumentParser(prog="Route_Backend.py batch",
+                                     description="Answer shortest-path queries without prompts")
+    parser.add_argument("graph", help="Source,Destination,Weight CSV (optionally .gz) or .snap snapshot")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file of Source[,Destination] lines, - for stdin (default)")
+    parser.add_argument("-o", "--out", default="-", help="results file, - for stdout (default)")
+    parser.add_argument("--format", choices=BATCH_FORMATS, default="jsonl")
+    parser.add_argument("--engine", default="auto", choices=ENGINES)
+    parser.add_argument("--mode", default="early_exit", choices=RELAX_MODES)
+    args = parser.parse_args(argv)
+    if args.mode == "queue" and args.engine not in ("auto", "dijkstra", "python"):
+        parser.error(f"--engine {args.engine} does not support --mode queue")
+
+    queries = out = None
+    try:
+        graph, city_names, errors = load_graph(args.graph)
+        queries = sys.stdin if args.queries == "-" else open(args.queries, newline="", encoding="utf-8")
+        out = sys.stdout if args.out == "-" else open(args.out, "w", newline="", encoding="utf-8",
+                                                      buffering=LOAD_BUFFER_SIZE)
+    except (OSError, ValueError) as e:
+        if queries is not None and queries is not sys.stdin:
+            queries.close()
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for msg in errors:
+        print(f"Skipped {msg}", file=sys.stderr)
+
+    try:
+        stats = run_batch(graph, city_names, queries, out, args.format, args.engine, args.mode)
+    except BrokenPipeError:
+        # Reader went away (e.g. piped into head); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if queries is not sys.stdin:
+            queries.close()
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    cache = stats["cache"]
+    print(f"{stats['queries']} queries ({stats['errors']} failed) in {stats['seconds']:.3f}s: "
+          f"{stats['queries_per_second']:.0f} queries/s, {cache['hits']} cache hits, "
+          f"{cache['misses']} misses", file=sys.stderr)
+    return 0 if stats["errors"] == 0 else 2
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch_main(sys.argv[2:]))
+    try:
+        print("\n🌟 Bellman-Ford Shortest Path Calculator")
+        print("=" * 40)
+        
+        if len(sys.argv) > 1:
+            graph, city_names, errors = load_graph(sys.argv[1])
+            for msg in errors:
+                print(f"Skipped {msg}")
+            verb = "Mapped" if sys.argv[1].endswith(".snap") else "Loaded"
+            print(f"\n📂 {verb} {graph.V} cities and {graph.E} roads from {sys.argv[1]}")
+        else:
+            graph, city_names = read_graph_interactive()
+        city_index = {}
+        for i, name in enumerate(city_names):
+            city_index.setdefault(name, i)
+        graph.instrumentation = Instrumentation()
+        # Every query of the session goes to one results file, opened (and
+        # truncated) by the first query so quitting early keeps the old one
+        results = None
+        try:
+            while True:
+                src_city = input("\nEnter source city ('stats' for the last query, 'quit' to exit): ").strip()
+                if src_city.lower() == 'quit':
+                    break
+                if src_city.lower() == 'stats' and src_city not in city_index:
+                    print(f"\n📊 {format_stats(graph.instrumentation.last)}")
+                    continue
+
+                src_idx = city_index.get(src_city)
+                if src_idx is None:
+                    print("Error: City not found!")
+                    continue
+
+                # Run algorithm
+                distances = graph.bellman_ford(src_idx, city_names)
+                if graph.last_stats["engine"] == "cache":
+                    print(f"\nUsing cached result for source: {city_names[src_idx]}")
+                elif graph.last_stats["negative_cycle"]:
+                    print("\nWarning: Graph contains negative weight cycle!")
+            
+                # Print results
+                print("\nShortest Distances:")
+                print("-" * 30)
+                for i, dist in enumerate(distances):
+                    if dist == sys.maxsize:
+                        print(f"{city_names[i]:<15} : INF")
+                    else:
+                        print(f"{city_names[i]:<15} : {dist}")
 
+                # Save results for visualization
+                if results is None:
+                    results = ResultWriter(RESULTS_PATH, city_names)
+                results.write(src_idx, distances)
+                results.flush()
+                print(f"\n✅ Results saved for visualization ({results.sources} sources in {RESULTS_PATH})")
+                print("Run 'python Route_Visualizer.py' to see the graph")
+        finally:
+            if results is not None:
+                results.close()
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
 
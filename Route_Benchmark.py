@@ -0,0 +1,311 @@
+"""Benchmark suite for the shortest-path engines
+
+    python Route_Benchmark.py [-V 500] [--degree 4] [--seed 1] [--out bench.json]
+    python Route_Benchmark.py --baseline bench_old.json
+
+Generates reproducible graphs (the same seed always gives the same graph),
+runs every available engine of Route_Backend and Route_Planner_Python on
+them and writes time, passes, relaxations and peak memory per run to a
+JSON file. With --baseline, runs that got slower than the threshold
+compared to an earlier results file are reported as regressions. Before
+timing anything, every engine's answers are checked against the plain
+Bellman-Ford; a wrong result exits with status 1.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Route_Backend import RELAX_MODES, Graph, optional_numpy
+
+try:
+    import Route_Planner_Python as planner
+except ImportError:
+    planner = None
+
+np = optional_numpy()
+
+# (V, srcs, dests, weights)
+EdgeArrays = Tuple[int, List[int], List[int], List[int]]
+
+MAX_WEIGHT = 100
+REGRESSION_THRESHOLD = 1.25
+
+
+# ---------------- Graph generators ----------------
+def random_sparse(V: int, E: int, seed: int, max_weight: int = MAX_WEIGHT) -> EdgeArrays:
+    """E uniformly random roads (no self loops) with weights in [1, max_weight]"""
+    rng = random.Random(seed)
+    srcs, dests, weights = [], [], []
+    while len(srcs) < E:
+        u, v = rng.randrange(V), rng.randrange(V)
+        if u != v:
+            srcs.append(u)
+            dests.append(v)
+            weights.append(rng.randint(1, max_weight))
+    return V, srcs, dests, weights
+
+def grid(V: int, seed: int, max_weight: int = MAX_WEIGHT) -> EdgeArrays:
+    """Road-like grid: two-way roads between neighbouring cities, about 4 roads per city"""
+    rng = random.Random(seed)
+    cols = max(1, math.isqrt(V))
+    srcs, dests, weights = [], [], []
+    for u in range(V):
+        for v in (u + 1 if (u + 1) % cols else -1, u + cols):
+            if 0 <= v < V:
+                w = rng.randint(1, max_weight)
+                srcs += (u, v)
+                dests += (v, u)
+                weights += (w, w)
+    return V, srcs, dests, weights
+
+def dense_complete(V: int, seed: int, max_weight: int = MAX_WEIGHT) -> EdgeArrays:
+    """A road between every ordered pair of distinct cities"""
+    rng = random.Random(seed)
+    srcs, dests, weights = [], [], []
+    for u in range(V):
+        for v in range(V):
+            if u != v:
+                srcs.append(u)
+                dests.append(v)
+                weights.append(rng.randint(1, max_weight))
+    return V, srcs, dests, weights
+
+def negative_edges(V: int, E: int, seed: int, max_weight: int = MAX_WEIGHT) -> EdgeArrays:
+    """Random sparse graph with many negative roads but no negative cycle
+
+    Weights are shifted by a random potential (w + h[v] - h[u]), which
+    leaves the length of every cycle unchanged and therefore non-negative.
+    """
+    V, srcs, dests, weights = random_sparse(V, E, seed, max_weight)
+    rng = random.Random(seed + 1)
+    h = [rng.randint(0, max_weight) for _ in range(V)]
+    weights = [w + h[v] - h[u] for u, v, w in zip(srcs, dests, weights)]
+    return V, srcs, dests, weights
+
+def negative_cycle(V: int, E: int, seed: int, max_weight: int = MAX_WEIGHT) -> EdgeArrays:
+    """negative_edges() plus a short cycle of total weight -1 reachable from city 0"""
+    V, srcs, dests, weights = negative_edges(V, E, seed, max_weight)
+    rng = random.Random(seed + 2)
+    cycle = rng.sample(range(1, V), min(V - 1, 4))
+    srcs.append(0)
+    dests.append(cycle[0])
+    weights.append(rng.randint(1, max_weight))
+    for i, u in enumerate(cycle):
+        srcs.append(u)
+        dests.append(cycle[(i + 1) % len(cycle)])
+        weights.append(1 if i else -len(cycle))
+    return V, srcs, dests, weights
+
+def families(V: int, degree: int, dense_v: int, seed: int) -> Dict[str, EdgeArrays]:
+    E = V * degree
+    return {
+        "random_sparse": random_sparse(V, E, seed),
+        "grid": grid(V, seed),
+        "dense_complete": dense_complete(dense_v, seed),
+        "negative_edges": negative_edges(V, E, seed),
+        "negative_cycle": negative_cycle(V, E, seed),
+    }
+
+
+# ---------------- Engines ----------------
+# Each runner takes a source and returns the run's counters
+Runner = Callable[[int], Dict[str, object]]
+
+def backend_engines(graph: Graph) -> List[Tuple[str, str]]:
+    """(engine, mode) pairs of Route_Backend that can run on graph"""
+    engines = [("python", mode) for mode in RELAX_MODES]
+    engines += [(engine, mode) for engine in ("scc", "yen", "yen_random") for mode in ("full", "early_exit")]
+    if np is not None:
+        engines += [("numpy", "full"), ("numpy", "early_exit")]
+    if not graph.has_negative_edges:
+        engines.append(("dijkstra", "heap"))
+    return engines
+
+def backend_runners(graph: Graph) -> Dict[Tuple[str, str, str], Runner]:
+    engines = backend_engines(graph)
+    graph.csr()
+    graph.scc_index()  # built once per graph version, like the CSR
+    graph.yen_order()
+    graph.yen_order(randomized=True)
+
+    def runner(engine, mode):
+        def run(src):
+            # Measure the engine, not the cache
+            graph.distance_cache.clear()
+            graph.shortest_path_tree(src, engine, "early_exit" if engine == "dijkstra" else mode)
+            stats = graph.last_stats
+            return {"passes": stats["passes"], "relaxations": stats["relaxations"],
+                    "negative_cycle": stats["negative_cycle"]}
+        return run
+
+    return {("Route_Backend", engine, mode): runner(engine, mode) for engine, mode in engines}
+
+def planner_runners(V: int, edges: List[Tuple[int, int, int]]) -> Dict[Tuple[str, str, str], Runner]:
+    if planner is None:
+        return {}
+
+    graph = planner.road_graph(V, edges)
+
+    def runner(mode):
+        def run(src):
+            # Measure the engine, not the cache
+            graph.distance_cache.clear()
+            stats = {}
+            planner.shortest_paths(V, edges, src, mode, stats, graph=graph)
+            return stats
+        return run
+
+    return {("Route_Planner_Python", "python", mode): runner(mode) for mode in RELAX_MODES}
+
+
+# ---------------- Correctness ----------------
+# Graphs that once tripped an engine: (V, srcs, dests, weights, source)
+KNOWN_CASES = [
+    # A route starting with a backward road needs ceil(V / 2) Yen passes, not V // 2
+    (5, [1, 0, 3, 2], [0, 3, 2, 4], [1, 1, 1, 1], 1),
+]
+
+def check_engines(cases: int = 200, seed: int = 1) -> List[str]:
+    """Compare every backend engine with the plain full Bellman-Ford
+
+    Runs KNOWN_CASES and small random graphs (with and without negative
+    roads and cycles) and returns one message per disagreement, so a
+    broken engine cannot put fast but wrong numbers into the table.
+    """
+    rng = random.Random(seed)
+    graphs = list(KNOWN_CASES)
+    for i in range(cases):
+        V = rng.randint(2, 12)
+        generator = rng.choice([random_sparse, negative_edges, negative_cycle if V > 5 else negative_edges])
+        graphs.append(generator(V, rng.randint(1, 3 * V), seed + i) + (rng.randrange(V),))
+
+    failures = []
+    for n, srcs, dests, weights, src in graphs:
+        graph = Graph.from_arrays(n, srcs, dests, weights)
+        reference = graph._shortest_paths(src, "python", "full")[0]
+        reference_cycle = graph.last_stats["negative_cycle"]
+        for engine, mode in backend_engines(graph):
+            graph.distance_cache.clear()
+            dist = graph._shortest_paths(src, engine, "early_exit" if engine == "dijkstra" else mode)[0]
+            cycle = graph.last_stats["negative_cycle"]
+            if cycle != reference_cycle or (not cycle and dist != reference):
+                failures.append(f"{engine}/{mode} on V={n} {list(zip(srcs, dests, weights))} from {src}: "
+                                f"{dist} (cycle={cycle}), expected {reference} (cycle={reference_cycle})")
+    return failures
+
+
+# ---------------- Measurement ----------------
+def measure(run: Runner, sources: List[int], repeat: int, memory: bool) -> Dict[str, object]:
+    """Per-query time over repeat rounds of all sources, then one traced round for peak memory
+
+    passes and relaxations are per-query means of the first round.
+    """
+    times = []
+    passes = relaxations = 0
+    cycle = False
+    for round_ in range(repeat):
+        start = time.perf_counter()
+        for src in sources:
+            counters = run(src)
+            if round_ == 0:
+                passes += counters["passes"]
+                relaxations += counters["relaxations"]
+                cycle = cycle or counters["negative_cycle"]
+        times.append((time.perf_counter() - start) / len(sources))
+    result = {"seconds": statistics.median(times), "seconds_min": min(times),
+              "passes": passes / len(sources), "relaxations": relaxations / len(sources),
+              "negative_cycle": cycle}
+    if memory:
+        tracemalloc.start()
+        for src in sources:
+            run(src)
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def run_suite(V: int = 500, degree: int = 4, dense_v: int = 150, seed: int = 1,
+              sources: int = 3, repeat: int = 3, memory: bool = True,
+              only: Optional[List[str]] = None, log=print) -> Dict[str, object]:
+    results = []
+    for name, (n, srcs, dests, weights) in families(V, degree, dense_v, seed).items():
+        if only and name not in only:
+            continue
+        rng = random.Random(seed)
+        graph = Graph.from_arrays(n, srcs, dests, weights)
+        edges = list(zip(srcs, dests, weights))
+        picks = [0] + [rng.randrange(n) for _ in range(sources - 1)]
+        runners = backend_runners(graph)
+        runners.update(planner_runners(n, edges))
+        for (module, engine, mode), run in runners.items():
+            row = {"graph": name, "V": n, "E": len(srcs), "module": module,
+                   "engine": engine, "mode": mode, "sources": len(picks)}
+            row.update(measure(run, picks, repeat, memory))
+            results.append(row)
+            log(f"{name:<15} {module:<21} {engine:<10} {mode:<11} "
+                f"{row['seconds'] * 1000:10.2f} ms {row['relaxations']:>12.0f} relax")
+    return {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__ if np is not None else None,
+                 "planner": planner is not None, "seed": seed, "V": V, "degree": degree,
+                 "dense_v": dense_v, "repeat": repeat},
+        "results": results,
+    }
+
+def compare(report: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Runs slower than threshold x the matching baseline run"""
+    key = lambda r: (r["graph"], r["V"], r["E"], r["module"], r["engine"], r["mode"])
+    old = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for row in report["results"]:
+        before = old.get(key(row))
+        if before and row["seconds"] > before["seconds"] * threshold:
+            regressions.append(f"{row['graph']} {row['module']} {row['engine']} {row['mode']}: "
+                               f"{before['seconds'] * 1000:.2f} ms -> {row['seconds'] * 1000:.2f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shortest-path engines")
+    parser.add_argument("-V", type=int, default=500, help="cities in the sparse, grid and negative graphs")
+    parser.add_argument("--degree", type=int, default=4, help="roads per city in the random graphs")
+    parser.add_argument("--dense-v", type=int, default=150, help="cities in the complete graph")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sources", type=int, default=3, help="queries per run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed rounds, at least 1 (median is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory round")
+    parser.add_argument("--graphs", nargs="*", help="only these generators")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    failures = check_engines()
+    for line in failures:
+        print(f"Wrong result: {line}")
+    if failures:
+        sys.exit(1)
+
+    report = run_suite(args.V, args.degree, args.dense_v, args.seed, args.sources,
+                       args.repeat, not args.no_memory, args.graphs)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n✅ {len(report['results'])} runs written to {args.out}")
+    if planner is None:
+        print("Route_Planner_Python engines skipped (module failed to import)")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
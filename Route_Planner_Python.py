@@ -1,70 +1,114 @@
-import tkinter as tk
-from tkinter import messagebox, ttk
-import networkx as nx
-import matplotlib.pyplot as plt
-import pandas as pd
+import sys
+import time
+from Route_Backend import BackgroundQuery, Graph, format_stats
+
+# The shortest-path code below needs no GUI: tkinter is loaded when a window
+# or message box opens and matplotlib when a plot does, so batch workers can
+# import this module cheaply.
+tk = ttk = messagebox = None
+
+def load_gui():
+    global tk, ttk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as _messagebox, ttk as _ttk
+        tk, ttk, messagebox = tkinter, _ttk, _messagebox
 
 # ---------------- Bellman-Ford Algorithm ----------------
-def bellman_ford(V, edges, source_index):
-    INF = float('inf')
-    dist = [INF] * V
-    parent = [-1] * V
-    dist[source_index] = 0
-
-    for _ in range(V - 1):
-        for (u, v, w) in edges:
-            if dist[u] != INF and dist[u] + w < dist[v]:
-                dist[v] = dist[u] + w
-                parent[v] = u
-
-    # Check for negative weight cycles
-    for (u, v, w) in edges:
-        if dist[u] != INF and dist[u] + w < dist[v]:
-            messagebox.showerror("Error", "Graph contains a negative weight cycle!")
-            return None, None
+# mode: "full" runs V-1 passes, "early_exit" stops after a pass with no
+# update, "queue" (SPFA) re-relaxes only out-edges of vertices that changed.
+# If a stats dict is passed it receives the mode, passes, relaxations,
+# early-exit pass, time spent in the negative-cycle check and total time.
+def bellman_ford(V, edges, source_index, mode="early_exit", stats=None):
+    dist, parent, negative_cycle = shortest_paths(V, edges, source_index, mode, stats)
+    if negative_cycle:
+        load_gui()
+        messagebox.showerror("Error", "Graph contains a negative weight cycle!")
+        return None, None
 
     return dist, parent
 
-# ---------------- Visualization ----------------
-def visualize_graph(city_names, edges, dist, parent, source_index):
-    G = nx.DiGraph()
-
-    for (u, v, w) in edges:
-        G.add_edge(city_names[u], city_names[v], weight=w)
+# Same computation without any UI, safe to call from a worker thread.
+# progress(done, total) is called after every pass; raising
+# QueryCancelled from it aborts the run. Pass the road_graph() of the
+# edges as graph to reuse its compact store and cached results.
+def shortest_paths(V, edges, source_index, mode="early_exit", stats=None, progress=None, graph=None):
+    start = time.perf_counter() if stats is not None else 0.0
+    if graph is None:
+        graph = road_graph(V, edges)
+    dist, parent = graph.shortest_path_tree(source_index, "python", mode, progress)
+    counters = graph.last_stats
+    if stats is not None:
+        stats.update(counters, seconds=time.perf_counter() - start)
+
+    # The backend marks unreachable cities with sys.maxsize; the UI shows INF
+    INF = float('inf')
+    return [INF if d == sys.maxsize else d for d in dist], parent, counters["negative_cycle"]
 
-    pos = nx.spring_layout(G, k=0.8, seed=42)
-    colors = []
+def road_graph(V, edges):
+    """Compact backend graph of (u, v, w) roads, built once per road set"""
+    srcs, dests, weights = zip(*edges) if edges else ((), (), ())
+    return Graph.from_arrays(V, srcs, dests, weights)
 
-    for node in G.nodes():
-        if node == city_names[source_index]:
-            colors.append('red')
-        else:
-            colors.append('skyblue')
+# ---------------- Visualization ----------------
+# The layout depends only on the roads, so it is computed once per road set.
+# Roads and cities are drawn as single collections; names and weights only
+# appear once few enough are in view (zoom in with the toolbar).
+_layouts = None
+
+def visualize_graph(city_names, edges, dist, parent, source_index, tree_only=False):
+    global _layouts
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from Route_Render import LabelLayer, LayoutCache, draw_edges, spring_layout
+    if _layouts is None:
+        _layouts = LayoutCache()
+    V = len(city_names)
+    pos = _layouts.get((V, tuple(edges)), lambda: spring_layout(V, edges))
+    if tree_only:
+        # Only the shortest-path tree: the road into each city from its parent
+        shown = [(parent[v], v, dist[v] - dist[parent[v]]) for v in range(V) if parent[v] >= 0]
+    else:
+        shown = edges
 
     plt.figure(figsize=(10, 6))
-    nx.draw(G, pos, with_labels=True, node_color=colors, node_size=2000,
-            font_size=10, edgecolors='black', arrows=True)
-    labels = nx.get_edge_attributes(G, 'weight')
-    nx.draw_networkx_edge_labels(G, pos, edge_labels=labels)
-    plt.title(f"Shortest Paths from {city_names[source_index]}")
+    ax = plt.gca()
+    draw_edges(ax, pos, [(u, v) for u, v, _ in shown], color="#555555", width=1.2)
+    colors = ['red' if i == source_index else 'skyblue' for i in range(V)]
+    node_size = 2000 if V <= 30 else max(30, 60000 // V)
+    ax.scatter(pos[:, 0], pos[:, 1], s=node_size, c=colors, edgecolors='black', zorder=3)
+    LabelLayer(ax, pos, city_names, ha='center', va='center', fontsize=10, zorder=4)
+    if shown:
+        mid = np.array([(pos[u] + pos[v]) / 2 for u, v, _ in shown])
+        LabelLayer(ax, mid, [str(w) for _, _, w in shown], fontsize=8, color='#333333', zorder=4,
+                   ha='center', va='center', bbox=dict(boxstyle='round,pad=0.1', fc='white', ec='none', alpha=0.7))
+    what = "Shortest-Path Tree" if tree_only else "Shortest Paths"
+    plt.title(f"{what} from {city_names[source_index]}")
+    ax.axis('off')
     plt.show()
 
 # ---------------- GUI Class ----------------
 class RoutePlannerApp:
     def __init__(self, root):
+        load_gui()
         self.root = root
         self.root.title("Optimal Route Planner")
         self.root.geometry("900x700")
         self.root.configure(bg="#f5f5f5")
 
         self.city_names = []
+        self.city_index = {}
         self.edges = []
+        self.graph = None  # road_graph(self.V, self.edges), rebuilt after the roads change
         self.V = 0
+        self.last_stats = {}
+        self.query = BackgroundQuery(self.root.after)  # runs Bellman-Ford off the Tk thread
 
         self.create_intro_screen()
 
     # Step 1: Number of cities
     def create_intro_screen(self):
+        self.query.cancel()
         for widget in self.root.winfo_children():
             widget.destroy()
 
@@ -112,6 +156,10 @@ class RoutePlannerApp:
         if any(name == "" for name in self.city_names):
             messagebox.showerror("Error", "All city names must be filled!")
             return
+        self.city_index = {}
+        for i, name in enumerate(self.city_names):
+            self.city_index.setdefault(name, i)
+        self.graph = None
 
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -164,9 +212,13 @@ class RoutePlannerApp:
             messagebox.showerror("Error", "Distance must be an integer!")
             return
 
-        src_index = self.city_names.index(src)
-        dest_index = self.city_names.index(dest)
+        src_index = self.city_index.get(src)
+        dest_index = self.city_index.get(dest)
+        if src_index is None or dest_index is None:
+            messagebox.showerror("Error", "Please pick cities from the list!")
+            return
         self.edges.append((src_index, dest_index, distance))
+        self.graph = None
 
         self.road_list.insert(tk.END, f"{src} → {dest} : {distance}")
         self.dist_entry.delete(0, tk.END)
@@ -190,18 +242,51 @@ class RoutePlannerApp:
         tk.Button(self.root, text="Show Result", command=self.show_result,
                   font=("Arial", 12), bg="#4CAF50", fg="white", width=15).pack(pady=20)
 
+        # Progress of the running computation (pass i of V-1)
+        self.progress_bar = ttk.Progressbar(self.root, mode="determinate", length=300)
+        self.progress_bar.pack(pady=5)
+        self.progress_label = tk.Label(self.root, text="", font=("Arial", 10), bg="#f5f5f5")
+        self.progress_label.pack()
+        tk.Button(self.root, text="Cancel", command=self.cancel_result,
+                  font=("Arial", 10), bg="#9E9E9E", fg="white", width=10).pack(pady=10)
+
     # Step 5: Show result table and graph
     def show_result(self):
+        """Run Bellman-Ford on a worker thread; clicking again supersedes the running query"""
         src_name = self.source_var.get()
-        src_index = self.city_names.index(src_name)
-
-        dist, parent = bellman_ford(self.V, self.edges, src_index)
-        if dist is None:
+        src_index = self.city_index[src_name]
+        if self.graph is None:
+            self.graph = road_graph(self.V, self.edges)
+        V, edges, graph = self.V, list(self.edges), self.graph
+
+        def work(progress):
+            stats = {}
+            dist, parent, negative_cycle = shortest_paths(V, edges, src_index, stats=stats,
+                                                          progress=progress, graph=graph)
+            return src_name, src_index, dist, parent, negative_cycle, stats
+
+        self.progress_bar.config(maximum=max(V - 1, 1), value=0)
+        self.progress_label.config(text=f"Running from {src_name}")
+        self.query.start(work, self.show_result_table, self.show_progress,
+                         lambda e: messagebox.showerror("Error", str(e)))
+
+    def show_progress(self, done, total):
+        self.progress_bar.config(maximum=total, value=done)
+        self.progress_label.config(text=f"Pass {done} of {total}")
+
+    def cancel_result(self):
+        if self.query.running:
+            self.query.cancel()
+            self.progress_bar.config(value=0)
+            self.progress_label.config(text="Cancelled")
+
+    def show_result_table(self, result):
+        src_name, src_index, dist, parent, negative_cycle, self.last_stats = result
+        if negative_cycle:
+            self.progress_label.config(text="")
+            messagebox.showerror("Error", "Graph contains a negative weight cycle!")
             return
 
-        result_data = {"City": self.city_names, "Distance": ["INF" if d == float('inf') else d for d in dist]}
-        df = pd.DataFrame(result_data)
-
         for widget in self.root.winfo_children():
             widget.destroy()
 
@@ -214,17 +299,24 @@ class RoutePlannerApp:
         tree.column("Distance", width=150)
         tree.pack(pady=20)
 
-        for _, row in df.iterrows():
-            tree.insert("", "end", values=(row["City"], row["Distance"]))
+        for name, d in zip(self.city_names, dist):
+            tree.insert("", "end", values=(name, "INF" if d == float('inf') else d))
+
+        tk.Label(self.root, text=f"Stats: {format_stats(self.last_stats)}", font=("Arial", 10),
+                 bg="#f5f5f5", fg="#555555").pack()
 
         tk.Button(self.root, text="Show Graph", command=lambda: visualize_graph(self.city_names, self.edges, dist, parent, src_index),
                   font=("Arial", 12), bg="#2196F3", fg="white", width=15).pack(pady=10)
 
+        tk.Button(self.root, text="Show Tree", command=lambda: visualize_graph(self.city_names, self.edges, dist, parent, src_index, tree_only=True),
+                  font=("Arial", 12), bg="#2196F3", fg="white", width=15).pack(pady=10)
+
         tk.Button(self.root, text="Restart", command=self.create_intro_screen,
                   font=("Arial", 12), bg="#9E9E9E", fg="white", width=10).pack(pady=10)
 
 
 if __name__ == "__main__":
+    load_gui()
     root = tk.Tk()
     app = RoutePlannerApp(root)
     root.mainloop()
@@ -0,0 +1,143 @@
+"""Batched, level-of-detail graph drawing shared by the GUIs
+
+Every road set and every city set is drawn as one matplotlib collection
+instead of one artist per road or city, layouts are cached per graph
+version, and text labels only exist for the cities inside the current
+view once few enough of them are visible (zoom in to see more).
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Sequence, Tuple
+
+import numpy as np
+from matplotlib.collections import EllipseCollection, LineCollection
+
+LABEL_LIMIT = 60
+LAYOUT_CACHE_ENTRIES = 8
+
+
+class LayoutCache:
+    """Small LRU of computed layouts; key them by (graph version, ...)"""
+    def __init__(self, max_entries: int = LAYOUT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        value = self._entries[key] = compute()
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+def spring_layout(V: int, edges: Sequence[Tuple[int, int, int]], seed: int = 42) -> np.ndarray:
+    """(V, 2) force-directed positions for cities 0..V-1 (isolated cities included)"""
+    import networkx as nx
+    G = nx.DiGraph()
+    G.add_nodes_from(range(V))
+    G.add_edges_from((u, v) for u, v, _ in edges)
+    pos = nx.spring_layout(G, k=0.8 if V <= 50 else None, seed=seed)
+    return np.array([pos[i] for i in range(V)], dtype=float).reshape(V, 2)
+
+def tree_layout(parent: Sequence[int], src: int) -> np.ndarray:
+    """(V, 2) tidy positions for a shortest-path tree: x = depth, leaves one row apart
+
+    Each inner city sits at the mean height of its children. Cities not
+    in the tree (unreachable) are stacked in a column left of the source.
+    """
+    V = len(parent)
+    children: List[List[int]] = [[] for _ in range(V)]
+    for v, p in enumerate(parent):
+        if p >= 0 and v != src:
+            children[p].append(v)
+    pos = np.zeros((V, 2))
+    placed = np.zeros(V, dtype=bool)
+    next_leaf = 0.0
+    # Iterative post-order walk (trees can be deeper than the recursion limit)
+    stack = [(src, 0, False)]
+    while stack:
+        u, depth, expanded = stack.pop()
+        if placed[u]:
+            continue
+        if not expanded and children[u]:
+            stack.append((u, depth, True))
+            stack.extend((c, depth + 1, False) for c in reversed(children[u]))
+            continue
+        ys = [pos[c, 1] for c in children[u] if placed[c]]
+        if ys:
+            y = sum(ys) / len(ys)
+        else:
+            y, next_leaf = next_leaf, next_leaf + 1
+        pos[u] = (depth, y)
+        placed[u] = True
+    unreached = np.nonzero(~placed)[0]
+    pos[unreached, 0] = -1
+    pos[unreached, 1] = np.arange(len(unreached))
+    return pos
+
+
+def draw_edges(ax, pos: np.ndarray, uv: Sequence[Tuple[int, int]], color="gray",
+               width: float = 1.0, alpha: float = 0.8, arrows: bool = True, zorder: float = 1):
+    """All roads as one LineCollection, plus one quiver of direction arrowheads"""
+    if not len(uv):
+        return
+    idx = np.asarray(uv, dtype=int).reshape(-1, 2)
+    start, end = pos[idx[:, 0]], pos[idx[:, 1]]
+    ax.add_collection(LineCollection(np.stack([start, end], axis=1), colors=color,
+                                     linewidths=width, alpha=alpha, zorder=zorder))
+    if arrows:
+        d = end - start
+        length = np.hypot(d[:, 0], d[:, 1])
+        keep = length > 0
+        d = d[keep] / length[keep, None]
+        at = start[keep] + 0.65 * (end[keep] - start[keep])
+        ax.quiver(at[:, 0], at[:, 1], d[:, 0], d[:, 1], color=color, alpha=alpha, zorder=zorder,
+                  angles="xy", pivot="mid", units="inches", scale_units="inches", scale=8,
+                  width=0.012, headwidth=5, headlength=6, headaxislength=5)
+
+def draw_circles(ax, xy: np.ndarray, radius, facecolors, edgecolors="none",
+                 linewidth: float = 1.0, zorder: float = 4, alpha=None):
+    """Circles with radii in data units (like patches.Circle) as one EllipseCollection"""
+    diameter = 2 * np.broadcast_to(np.asarray(radius, dtype=float), (len(xy),))
+    circles = EllipseCollection(diameter, diameter, np.zeros(len(xy)), units="xy", offsets=xy,
+                                offset_transform=ax.transData, facecolors=facecolors,
+                                edgecolors=edgecolors, linewidths=linewidth, zorder=zorder, alpha=alpha)
+    ax.add_collection(circles)
+    return circles
+
+
+class LabelLayer:
+    """Text labels that only exist while at most limit of their anchors are in view
+
+    Hooked to the axes' limit callbacks, so zooming in (toolbar or
+    set_xlim) brings the labels of the visible cities back; ax.clear()
+    drops both the texts and the hooks.
+    """
+    def __init__(self, ax, xy: np.ndarray, texts: Sequence[str], limit: int = LABEL_LIMIT, **text_kw):
+        self.ax = ax
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.texts = texts
+        self.limit = limit
+        self.text_kw = text_kw
+        self.artists = {}
+        # A plain function, not the bound method: the registry only keeps weak
+        # references to bound methods, and nothing else holds on to the layer
+        update = lambda ax: self.update()
+        ax.callbacks.connect("xlim_changed", update)
+        ax.callbacks.connect("ylim_changed", update)
+        self.update()
+
+    def update(self, ax=None):
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        x, y = self.xy[:, 0], self.xy[:, 1]
+        inside = np.nonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))[0]
+        show = set(inside.tolist()) if len(inside) <= self.limit else set()
+        for i in [i for i in self.artists if i not in show]:
+            self.artists.pop(i).remove()
+        for i in show:
+            if i not in self.artists:
+                self.artists[i] = self.ax.text(x[i], y[i], self.texts[i], **self.text_kw)
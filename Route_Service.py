@@ -0,0 +1,231 @@
+"""Local HTTP/JSON query service over the route engine
+
+    python Route_Service.py route_edges.csv [port]
+    python Route_Service.py graph.snap [port]
+
+The graph is loaded once and queries are answered by worker threads, so the
+asyncio event loop keeps accepting connections while a long Bellman-Ford
+runs. All workers share the graph's DistanceCache, and concurrent requests
+for the same source, engine and mode wait on one computation instead of each
+running their own.
+
+    GET /health                          -> cities, roads, graph version
+    GET /distance?src=A                  -> distances from A to every city
+    GET /distance?src=A&dest=B           -> distance from A to B
+    GET /path?src=A&dest=B               -> distance and cities on the route
+    GET /stats                           -> request and cache counters
+
+Unreachable cities have a null distance. Optional query parameters
+engine= and mode= are passed through to the engine.
+"""
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from Route_Backend import ENGINES, RELAX_MODES, Graph, SingleFlight, load_graph, path_from_parents
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_HEADER_BYTES = 16 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Request Header Fields Too Large", 422: "Unprocessable Entity",
+           500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """Query that cannot be answered; carries the HTTP status"""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RouteService:
+    def __init__(self, graph: Graph, city_names: List[str], workers: Optional[int] = None):
+        self.graph = graph
+        self.city_names = city_names
+        self.city_index: Dict[str, int] = {}
+        for i, name in enumerate(city_names):
+            self.city_index.setdefault(name, i)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="route")
+        # Waiters are coroutines here, so a burst of identical requests holds no worker threads
+        self.inflight = SingleFlight()
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """Start listening; port 0 picks a free port (see server.sockets[0].getsockname())"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it (HTTP/1.1 keep-alive)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 413, {"error": "Request header too large"}, False)
+                    break
+                try:
+                    method, target, keep_alive = self.parse_head(head)
+                except RequestError as e:
+                    await self.respond(writer, e.status, {"error": str(e)}, False)
+                    break
+                status, payload = await self.dispatch(method, target)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def parse_head(head: bytes) -> Tuple[str, str, bool]:
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3:
+            raise RequestError(400, "Malformed request line")
+        method, target, version = parts
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip().lower()
+        connection = headers.get("connection", "")
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, target, keep_alive
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def dispatch(self, method: str, target: str) -> Tuple[int, Dict]:
+        self.requests += 1
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if method != "GET":
+                raise RequestError(405, "Only GET is supported")
+            if url.path == "/health":
+                return 200, {"status": "ok", "cities": self.graph.V, "roads": self.graph.E,
+                             "version": self.graph.version}
+            if url.path == "/stats":
+                return 200, {"requests": self.requests, "errors": self.errors,
+                             "cache": self.graph.distance_cache.stats(),
+                             "single_flight": self.inflight.stats()}
+            if url.path == "/distance":
+                return 200, await self.distance(query)
+            if url.path == "/path":
+                return 200, await self.path(query)
+            raise RequestError(404, f"Unknown endpoint: {url.path}")
+        except RequestError as e:
+            self.errors += 1
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            self.errors += 1
+            return 500, {"error": str(e)}
+
+    def city(self, query: Dict[str, str], key: str) -> int:
+        name = query.get(key)
+        if name is None:
+            raise RequestError(400, f"Missing parameter: {key}")
+        idx = self.city_index.get(name)
+        if idx is None:
+            raise RequestError(404, f"Unknown city: {name}")
+        return idx
+
+    async def tree(self, src: int, query: Dict[str, str]) -> Tuple[List[int], List[int]]:
+        """Shortest-path tree from src, computed on a worker thread"""
+        engine = query.get("engine", "auto")
+        mode = query.get("mode", "early_exit")
+        if engine not in ENGINES:
+            raise RequestError(400, f"Unknown engine: {engine}")
+        if mode not in RELAX_MODES:
+            raise RequestError(400, f"Unknown mode: {mode}")
+        try:
+            engine = self.graph.resolve_engine(engine, mode)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+        dist, parent, negative_cycle = await self.inflight.do_async(
+            (self.graph.version, src, engine, mode), self.compute, src, engine, mode, executor=self.executor)
+        if negative_cycle:
+            raise RequestError(422, "Graph contains negative weight cycle")
+        return dist, parent
+
+    def compute(self, src: int, engine: str, mode: str) -> Tuple[List[int], List[int], bool]:
+        try:
+            dist, parent = self.graph.shortest_path_tree(src, engine, mode)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+        # last_stats is per thread, so it belongs to this query
+        return dist, parent, self.graph.last_stats["negative_cycle"]
+
+    @staticmethod
+    def json_distance(d: int) -> Optional[int]:
+        return None if d == sys.maxsize else d
+
+    async def distance(self, query: Dict[str, str]) -> Dict:
+        src = self.city(query, "src")
+        dest = self.city(query, "dest") if "dest" in query else None
+        dist, _ = await self.tree(src, query)
+        if dest is not None:
+            return {"source": self.city_names[src], "destination": self.city_names[dest],
+                    "distance": self.json_distance(dist[dest])}
+        return {"source": self.city_names[src],
+                "distances": {name: self.json_distance(dist[i])
+                              for i, name in enumerate(self.city_names)}}
+
+    async def path(self, query: Dict[str, str]) -> Dict:
+        src = self.city(query, "src")
+        dest = self.city(query, "dest")
+        dist, parent = await self.tree(src, query)
+        path = path_from_parents(parent, src, dest)
+        return {"source": self.city_names[src], "destination": self.city_names[dest],
+                "distance": self.json_distance(dist[dest]),
+                "path": [self.city_names[v] for v in path]}
+
+
+async def serve(graph: Graph, city_names: List[str], host: str = DEFAULT_HOST,
+                port: int = DEFAULT_PORT, workers: Optional[int] = None):
+    service = RouteService(graph, city_names, workers)
+    server = await service.start(host, port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"\n🌐 Serving {graph.V} cities and {graph.E} roads on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python Route_Service.py <graph.csv|graph.snap> [port]")
+        return
+    path = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    try:
+        graph, city_names, errors = load_graph(path)
+        for msg in errors:
+            print(f"Skipped {msg}")
+        asyncio.run(serve(graph, city_names, port=port))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"\n❌ Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,119 @@
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
-import subprocess  # To run our C program
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 import random      # For generating random distances
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import networkx as nx  # For graph visualization
+import sys
+from Route_Backend import (BackgroundQuery, EdgeStore, Instrumentation, format_stats,
+                           path_from_next_hop, path_from_parents)
+# matplotlib, numpy and Route_Render are imported where the window and its
+# plot are built, so importing this module does not load the plotting stack
+
+MAX_CITIES = 10000
+ALL_PAIRS_MAX_CITIES = 300  # Floyd–Warshall is O(V³) and prints a V×V table
+RANDOM_COMPLETE_MAX_CITIES = 15  # beyond this, random roads are sparse
+ROAD_VIEW_MAX_CITIES = 40  # beyond this, only the shortest-path tree is drawn
+
+def city_label(i):
+    """Spreadsheet-style city names: A..Z, AA..AZ, BA.."""
+    name = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        name = chr(65 + r) + name
+    return name
+
+class RoadTableView(tk.Frame):
+    """Virtualized editor over an EdgeStore
+
+    A fixed pool of Entry rows is pointed at whichever store rows are
+    scrolled into view, so the widget count does not grow with the number
+    of roads. Keystrokes are written straight into the store row, which
+    marks only that row for re-parsing.
+    """
+    COLUMNS = (("From", 12), ("To", 12), ("Distance", 8))
+
+    def __init__(self, master, store, on_edit, visible_rows=12):
+        super().__init__(master, bg='#f0f0f0')
+        self.store, self.on_edit, self.visible_rows, self.top = store, on_edit, visible_rows, 0
+
+        grid = tk.Frame(self, bg='#f0f0f0')
+        grid.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tk.Label(grid, text="#", font=("Arial", 10, "bold"), bg='#3498db', fg='white',
+                 width=6, relief=tk.RAISED).grid(row=0, column=0, padx=1, pady=1)
+        for c, (title, width) in enumerate(self.COLUMNS):
+            tk.Label(grid, text=title, font=("Arial", 10, "bold"), bg='#3498db', fg='white',
+                     width=width, relief=tk.RAISED).grid(row=0, column=c + 1, padx=1, pady=1)
+
+        self.row_labels, self.cells = [], []
+        for r in range(visible_rows):
+            label = tk.Label(grid, text="", font=("Arial", 8), bg='#f0f0f0', fg='#555', width=6, anchor='e')
+            label.grid(row=r + 1, column=0, padx=1)
+            self.row_labels.append(label)
+            entries = []
+            for c, (_, width) in enumerate(self.COLUMNS):
+                e = tk.Entry(grid, width=width, justify="center", font=("Arial", 9))
+                e.grid(row=r + 1, column=c + 1, padx=1, pady=1)
+                e.bind("<KeyRelease>", lambda event, r=r, c=c: self.cell_edited(r, c))
+                for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                    e.bind(seq, self.wheel)
+                entries.append(e)
+            self.cells.append(entries)
+
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            grid.bind(seq, self.wheel)
+        self.refresh()
+
+    def cell_edited(self, r, c):
+        i = self.top + r
+        # Tab, arrows and Shift also fire <KeyRelease>; only real edits count
+        if i < len(self.store) and self.store.set_cell(i, c, self.cells[r][c].get()):
+            self.on_edit()
+
+    def yview(self, *args):
+        """Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")"""
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.store)))
+        else:
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.scroll_to(self.top + (-3 if up else 3))
+        return "break"
+
+    def scroll_to(self, top):
+        self.top = max(0, min(top, len(self.store) - self.visible_rows))
+        self.refresh()
+
+    def focused_row(self):
+        """Store row of the Entry that has keyboard focus, or None"""
+        focus = self.focus_get()
+        for r, entries in enumerate(self.cells):
+            if focus in entries and self.top + r < len(self.store):
+                return self.top + r
+        return None
+
+    def refresh(self):
+        """Show store rows top .. top+visible_rows in the widget pool (bad rows tinted)"""
+        n = len(self.store)
+        for r, entries in enumerate(self.cells):
+            i = self.top + r
+            road = self.store.rows[i] if i < n else None
+            self.row_labels[r].config(text=str(i + 1) if road else "")
+            for c, e in enumerate(entries):
+                e.config(state='normal')
+                e.delete(0, tk.END)
+                if road is None:
+                    e.config(state='disabled', disabledbackground='#ecf0f1')
+                else:
+                    e.insert(0, road.text[c])
+                    e.config(bg='#fadbd8' if road.error else 'white')
+        if n:
+            self.scrollbar.set(self.top / n, min(1.0, (self.top + self.visible_rows) / n))
+        else:
+            self.scrollbar.set(0, 1)
 
 class BellmanFordGUI:
     def __init__(self, root):
@@ -16,7 +124,14 @@ class BellmanFordGUI:
         self.root.configure(bg='#f0f0f0')
 
         # Variables to store our data
-        self.city_entries, self.city_names, self.city_count, self.graph_data = [], [], 0, None
+        self.city_names, self.graph_data = [], None
+        self.store = EdgeStore()  # road table; its Graph is rebuilt only after an edit
+        self.engine_graph = None  # last Graph handed out by the store (instrumented)
+        self.instrumentation = Instrumentation()  # survives graph rebuilds
+        self.query = BackgroundQuery(self.root.after)  # runs queries off the Tk thread
+        from Route_Render import LayoutCache
+        self.layouts = LayoutCache()  # drawn scenes per (road-table version, source, view)
+        self.last_drawing = None
 
         # Create title label at the top with better styling
         title_frame = tk.Frame(root, bg='#2c3e50', pady=15)
@@ -44,29 +159,43 @@ class BellmanFordGUI:
         
         frame_top = tk.Frame(input_section, bg='#f0f0f0')
         frame_top.pack(pady=5)
-        tk.Label(frame_top, text="Number of Cities (2-15):", font=("Arial", 10), 
+        tk.Label(frame_top, text=f"Number of Cities (2-{MAX_CITIES}):", font=("Arial", 10), 
                 bg='#f0f0f0').grid(row=0, column=0, padx=5, sticky='w')
         self.entry_cities = tk.Entry(frame_top, width=10, font=("Arial", 10))
         self.entry_cities.grid(row=0, column=1, padx=5)
-        tk.Button(frame_top, text="Create Matrix", command=self.create_matrix, 
+        tk.Button(frame_top, text="Create Cities", command=self.create_cities, 
                  bg='#3498db', fg='white', font=("Arial", 10, "bold"), 
                  relief=tk.RAISED, padx=10, pady=5).grid(row=0, column=2, padx=5)
+        tk.Button(frame_top, text="📂 Import CSV", command=self.import_csv,
+                 bg='#2980b9', fg='white', font=("Arial", 10, "bold"),
+                 relief=tk.RAISED, padx=10, pady=5).grid(row=0, column=3, padx=5)
 
-        # Section 2: Distance matrix container (with better styling)
-        matrix_section = tk.LabelFrame(left_frame, text="📝 Step 2: Distance Matrix", 
+        # Section 2: Road table (one row per road; blank or INF distance = no road)
+        roads_section = tk.LabelFrame(left_frame, text="📝 Step 2: Roads", 
                                        font=("Arial", 11, "bold"), bg='#f0f0f0', 
                                        relief=tk.GROOVE, borderwidth=2, padx=10, pady=10)
-        matrix_section.pack(pady=5, fill=tk.BOTH, expand=True)
-        
-        self.matrix_frame = tk.Frame(matrix_section, bg='#f0f0f0')
-        self.matrix_frame.pack(pady=5)
-
-        # Button to generate random distances (disabled until matrix is created)
-        self.random_btn = tk.Button(matrix_section, text="🎲 Generate Random Distances", 
-                                    command=self.randomize_matrix, state="disabled",
+        roads_section.pack(pady=5, fill=tk.BOTH, expand=True)
+
+        self.road_view = RoadTableView(roads_section, self.store, self.roads_edited)
+        self.road_view.pack(pady=5, fill=tk.BOTH, expand=True)
+
+        road_buttons = tk.Frame(roads_section, bg='#f0f0f0')
+        road_buttons.pack(pady=5)
+        tk.Button(road_buttons, text="➕ Add Road", command=self.add_road,
+                  bg='#3498db', fg='white', font=("Arial", 10, "bold"),
+                  relief=tk.RAISED, padx=10, pady=5).pack(side=tk.LEFT, padx=5)
+        tk.Button(road_buttons, text="🗑 Delete Road", command=self.delete_road,
+                  bg='#7f8c8d', fg='white', font=("Arial", 10, "bold"),
+                  relief=tk.RAISED, padx=10, pady=5).pack(side=tk.LEFT, padx=5)
+        # Button to generate random roads (disabled until cities are created)
+        self.random_btn = tk.Button(road_buttons, text="🎲 Random Roads", 
+                                    command=self.randomize_roads, state="disabled",
                                     bg='#9b59b6', fg='white', font=("Arial", 10, "bold"),
                                     relief=tk.RAISED, padx=10, pady=5)
-        self.random_btn.pack(pady=5)
+        self.random_btn.pack(side=tk.LEFT, padx=5)
+        self.roads_label = tk.Label(roads_section, text="No roads yet", font=("Arial", 9, "italic"),
+                                    bg='#f0f0f0', fg='#555')
+        self.roads_label.pack()
 
         # Section 3: Source selection and algorithm execution
         control_section = tk.LabelFrame(left_frame, text="🚀 Step 3: Run Algorithm", 
@@ -79,14 +208,33 @@ class BellmanFordGUI:
         tk.Label(source_frame, text="Select Source City:", font=("Arial", 10), 
                 bg='#f0f0f0').pack(side=tk.LEFT, padx=5)
         self.source_var = tk.StringVar()
-        self.source_menu = tk.OptionMenu(source_frame, self.source_var, [])
-        self.source_menu.config(font=("Arial", 10), width=8)
+        self.source_menu = ttk.Combobox(source_frame, textvariable=self.source_var, values=[],
+                                        font=("Arial", 10), width=12)
         self.source_menu.pack(side=tk.LEFT, padx=5)
 
         # Button to run the algorithm
         tk.Button(control_section, text="▶ Run Algorithm", command=self.run_algorithm,
                  bg='#27ae60', fg='white', font=("Arial", 11, "bold"),
                  relief=tk.RAISED, padx=20, pady=8).pack(pady=10)
+        # Progress of the running query (relaxation pass i of V-1) and a way to stop it
+        progress_frame = tk.Frame(control_section, bg='#f0f0f0')
+        progress_frame.pack(pady=(0, 10), fill=tk.X)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.progress_label = tk.Label(progress_frame, text="Idle", font=("Arial", 9),
+                                       bg='#f0f0f0', width=16, anchor='w')
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        tk.Button(progress_frame, text="✖ Cancel", command=self.cancel_run,
+                 bg='#c0392b', fg='white', font=("Arial", 9, "bold"),
+                 relief=tk.RAISED, padx=8).pack(side=tk.LEFT, padx=5)
+        # Draw only the shortest-path tree instead of one road per destination
+        self.tree_only_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_section, text="🌳 Shortest-path tree only", variable=self.tree_only_var,
+                       command=self.redraw, bg='#f0f0f0', font=("Arial", 9)).pack()
+        # Button to compute all-pairs distances over the whole road table
+        tk.Button(control_section, text="▦ All-Pairs (Floyd–Warshall)", command=self.run_all_pairs,
+                 bg='#16a085', fg='white', font=("Arial", 10, "bold"),
+                 relief=tk.RAISED, padx=10, pady=5).pack(pady=(0, 10))
 
         # Section 4: Results display (with better styling)
         results_section = tk.LabelFrame(left_frame, text="📋 Results", 
@@ -98,6 +246,7 @@ class BellmanFordGUI:
                                                     font=("Consolas", 9), bg='#ffffff',
                                                     relief=tk.SUNKEN, borderwidth=2)
         self.txt_output.pack(pady=5, fill=tk.BOTH, expand=True)
+        self.txt_output.tag_config("warn", foreground="red")
 
         # Section 5: Graph visualization area (improved styling)
         graph_header = tk.Frame(right_frame, bg='#34495e', pady=10)
@@ -106,9 +255,12 @@ class BellmanFordGUI:
                 font=("Arial", 13, "bold"), bg='#34495e', fg='white').pack()
         
         # Create a matplotlib figure for drawing the graph with more space
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from matplotlib.figure import Figure
         self.fig = Figure(figsize=(7, 7), dpi=100, facecolor='white')
         self.ax = self.fig.add_subplot(111)
         self.canvas = FigureCanvasTkAgg(self.fig, master=right_frame)
+        NavigationToolbar2Tk(self.canvas, right_frame)  # zoom/pan; labels appear when zoomed in
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Show initial message before any graph is created
@@ -116,75 +268,77 @@ class BellmanFordGUI:
                     ha='center', va='center', fontsize=12, color='#7f8c8d', style='italic')
         self.ax.set_xlim(0, 1); self.ax.set_ylim(0, 1); self.ax.axis('off'); self.canvas.draw()
 
-    def create_matrix(self):
-        """Creates the distance matrix based on user input"""
+    def create_cities(self):
+        """Start a new road table over cities A, B, C, ..."""
         try:
             # Get the number of cities from the entry box and validate
-            self.city_count = int(self.entry_cities.get())
-            if not 2 <= self.city_count <= 15:
-                messagebox.showerror("Error", "Enter 2-15 cities"); return
+            count = int(self.entry_cities.get())
+            if not 2 <= count <= MAX_CITIES:
+                messagebox.showerror("Error", f"Enter 2-{MAX_CITIES} cities"); return
         except ValueError:
             messagebox.showerror("Error", "Invalid number"); return
 
-        # Clear any existing matrix
-        for widget in self.matrix_frame.winfo_children(): widget.destroy()
-        self.city_entries.clear()
-
-        # Auto-generate city names: A, B, C, D, etc. (chr(65) = 'A')
-        self.city_names = [chr(65 + i) for i in range(self.city_count)]
-
-        # Add instruction label and column headers
-        tk.Label(self.matrix_frame, text="Enter distances (0 = same city, INF = no direct road)", 
-                font=("Arial", 9, "italic"), bg='#f0f0f0', fg='#555').grid(
-                row=0, column=0, columnspan=self.city_count+1, pady=5)
-        # Column headers
-        tk.Label(self.matrix_frame, text="", bg='#f0f0f0').grid(row=1, column=0)  # Empty corner
-        for j, name in enumerate(self.city_names):
-            tk.Label(self.matrix_frame, text=name, font=("Arial", 10, "bold"), 
-                    bg='#3498db', fg='white', width=5, relief=tk.RAISED).grid(
-                    row=1, column=j+1, padx=1, pady=1)
-
-        # Create the matrix grid with entry boxes (improved styling)
-        for i, name in enumerate(self.city_names):
-            # Row headers
-            tk.Label(self.matrix_frame, text=name, font=("Arial", 10, "bold"), 
-                    bg='#3498db', fg='white', width=5, relief=tk.RAISED).grid(
-                    row=i+2, column=0, padx=1, pady=1)
-            row_entries = []
-            for j in range(self.city_count):
-                e = tk.Entry(self.matrix_frame, width=6, justify="center", font=("Arial", 9))
-                e.grid(row=i+2, column=j+1, padx=1, pady=1)
-                if i == j:
-                    e.insert(0, "0")
-                    e.config(state='readonly', readonlybackground='#ecf0f1')  # Diagonal is read-only
-                else:
-                    e.insert(0, "")
-                row_entries.append(e)
-            self.city_entries.append(row_entries)
-
-        # Update the source city dropdown menu
-        self.source_var.set(self.city_names[0])
-        menu = self.source_menu["menu"]
-        menu.delete(0, "end")
-        for name in self.city_names:
-            menu.add_command(label=name, command=lambda v=name: self.source_var.set(v))
+        self.store.reset(city_label(i) for i in range(count))
+        self.road_view.scroll_to(0)
+        self.roads_edited()
         self.random_btn.config(state="normal")  # Enable the random button
 
-
-
-
-
-
-
-
-
+    def import_csv(self):
+        """Append the roads of a Source,Destination,Weight file to the table"""
+        path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv *.csv.gz"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            added = self.store.load_csv(path)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Could not read {path}: {e}"); return
+        bad = self.store.parse()
+        self.road_view.refresh()
+        self.roads_edited()
+        self.random_btn.config(state="normal")
+        self.txt_output.delete("1.0", tk.END)
+        self.txt_output.insert(tk.END, f"Imported {added} roads from {path}\n")
+        if bad:
+            self.txt_output.insert(tk.END, f"{len(bad)} rows are invalid and will be skipped\n", "warn")
+
+    def add_road(self):
+        self.store.append()
+        self.road_view.scroll_to(len(self.store))
+        self.road_view.cells[min(len(self.store), self.road_view.visible_rows) - 1][0].focus_set()
+        self.roads_edited()
+
+    def delete_road(self):
+        row = self.road_view.focused_row()
+        if row is None:
+            messagebox.showinfo("Delete Road", "Click into the road to delete first"); return
+        self.store.delete(row)
+        self.road_view.scroll_to(self.road_view.top)
+        self.roads_edited()
+
+    def roads_edited(self):
+        """Any change to the table: refresh the city list and drop a now-stale run"""
+        self.cancel_run()
+        self.city_names = self.store.graph()[1]
+        self.source_menu.config(values=self.city_names)
+        if self.city_names and self.source_var.get() not in self.city_names:
+            self.source_var.set(self.city_names[0])
+        self.roads_label.config(text=f"{len(self.store)} roads, {len(self.city_names)} cities")
 
     # ...existing code...
-    def draw_graph(self, highlight_source=None, shortest_distances=None):
-        """Draw road-style visualization: clearer city labels & fit whole graph in frame."""
+    def draw_graph(self, highlight_source=None, shortest_distances=None, parent=None):
+        """Draw the routes from highlight_source: clear city labels, whole graph in frame.
+
+        parent is the shortest-path tree (index of the city before each city on its
+        route). Road view draws one road per destination; tree view (checkbox, and
+        always above ROAD_VIEW_MAX_CITIES cities) draws each city once, placed by
+        its depth in the tree. Scenes are cached per road-table version and source,
+        every road/city set is a single collection, and names and distance badges
+        only appear once few enough cities are in view (zoom in with the toolbar).
+        """
+        import numpy as np
+        from matplotlib.collections import LineCollection
         from matplotlib.lines import Line2D
-        from matplotlib.patches import Circle
-
+        from Route_Render import LabelLayer, draw_circles, draw_edges
         self.ax.clear()
         self.txt_output.tag_config("warn", foreground="red")
 
@@ -196,152 +350,156 @@ class BellmanFordGUI:
             self.ax.set_xlim(-1, 11); self.ax.set_ylim(-10, 10); self.ax.axis('off'); self.canvas.draw()
             return
 
-        # Build directed edges from the matrix
-        all_edges = {}
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                val = self.city_entries[i][j].get().strip().upper()
-                if val and val != "INF":
-                    try:
-                        w = int(val)
-                    except ValueError:
-                        continue
-                    if not (i == j and w == 0):
-                        all_edges[(self.city_names[i], self.city_names[j])] = w
-
-        source = highlight_source
-        destinations = [c for c in self.city_names if c != source]
-        n_dest = len(destinations)
-        y_spacing = 2.0
-
-        # Reconstruct paths
-        all_paths = []
-        verification_messages = []
-        for idx, dest in enumerate(destinations):
-            y_pos = (idx - (n_dest - 1) / 2) * y_spacing
-            dest_dist = shortest_distances.get(dest, float('inf'))
-            if dest_dist == float('inf'):
-                all_paths.append((dest, [source, dest], [], y_pos, dest_dist))
-                continue
-
-            path = [dest]; current = dest; safe_break = 0
-            while current != source and safe_break < (self.city_count * 2):
-                safe_break += 1; found = False
-                for p in self.city_names:
-                    if p == current: continue
-                    if (p, current) in all_edges:
-                        w = all_edges[(p, current)]
-                        p_dist = shortest_distances.get(p, float('inf'))
-                        cur_dist = shortest_distances.get(current, float('inf'))
-                        if p_dist != float('inf') and p_dist + w == cur_dist:
-                            path.insert(0, p); current = p; found = True; break
-                if not found: break
-
-            if path[0] != source:
-                all_paths.append((dest, [source, dest], [], y_pos, dest_dist)); continue
-
-            path_edges = [(path[i], path[i+1], all_edges.get((path[i], path[i+1]), 0))
-                          for i in range(len(path) - 1)]
-            sum_w = sum(w for _, _, w in path_edges)
-            if sum_w != dest_dist:
-                verification_messages.append(f"⚠ Path to {dest}: sum={sum_w} vs reported={dest_dist}")
-            all_paths.append((dest, path, path_edges, y_pos, dest_dist))
+        self.last_drawing = (highlight_source, shortest_distances, parent)
+        src = self.city_names.index(highlight_source)
+        tree_view = self.tree_only_var.get() or len(self.city_names) > ROAD_VIEW_MAX_CITIES
+        make_scene = self.tree_scene if tree_view else self.road_scene
+        scene = self.layouts.get((self.store.version, src, tree_view, tuple(parent)),
+                                 lambda: make_scene(src, shortest_distances, parent))
 
         # Drawing parameters
         self.ax.set_facecolor('#f6fbff')
-        node_radius = 0.45
-        src_x = 0.8
-        max_x = 10.0
-        all_x = []
-        all_y = []
-
-        # Draw each path as a road
-        for dest, path_nodes, path_edges, y_pos, dest_dist in all_paths:
-            path_len = len(path_nodes)
-            xs = []; ys = []
-            for i in range(path_len):
-                if i == 0:
-                    x = src_x
-                else:
-                    x = max_x if (path_len - 1 == 1) else src_x + (max_x - src_x) * (i) / (path_len - 1)
-                xs.append(x); ys.append(y_pos)
-                all_x.append(x); all_y.append(y_pos)
-
-            # Road base
-            road_line = Line2D(xs, ys, linewidth=18, color='#3f3f3f', solid_capstyle='round', zorder=1, alpha=0.97)
-            self.ax.add_line(road_line)
-            # Road edges
-            self.ax.add_line(Line2D(xs, [y - 0.28 for y in ys], linewidth=2.4, color='#7a7a7a', solid_capstyle='round', zorder=1.1, alpha=0.6))
-            self.ax.add_line(Line2D(xs, [y + 0.28 for y in ys], linewidth=2.4, color='#7a7a7a', solid_capstyle='round', zorder=1.1, alpha=0.6))
-            # Center dashed lane
-            self.ax.add_line(Line2D(xs, ys, linewidth=2.0, color='white', linestyle=(0, (10, 8)), solid_capstyle='round', zorder=2, alpha=0.95))
-
-            # Draw nodes + labels (name inside node, distance badge to the right)
-            for i, node_name in enumerate(path_nodes):
-                x = xs[i]; y = ys[i]
-                # shadow
-                self.ax.add_patch(Circle((x + 0.10, y - 0.10), node_radius + 0.12, color='#000', alpha=0.06, zorder=3))
-                if i == 0:
-                    face, edgec = '#FF6B6B', '#CC2E2E'
-                    size = node_radius + 0.05
-                else:
-                    reachable = (dest_dist != float('inf'))
-                    if node_name == dest:
-                        face = '#44FF44' if reachable else '#88B3FF'; edgec = '#00AA00' if reachable else '#0066CC'
-                        size = node_radius
-                    else:
-                        face = '#DFF5E0' if dest_dist != float('inf') else '#E6E9EE'; edgec = '#A3C293' if dest_dist != float('inf') else '#BFC9CA'
-                        size = node_radius * 0.85
-                self.ax.add_patch(Circle((x, y), size, facecolor=face, edgecolor=edgec, linewidth=1.4, zorder=4))
-
-                # Name inside node (clear, bold, clipped)
-                self.ax.text(x, y, node_name, ha='center', va='center', fontsize=10, fontweight='bold',
-                             color='#1b2733', zorder=5)
-
-                # Distance badge to the right of node (small rounded bbox)
-                node_dist = shortest_distances.get(node_name, float('inf'))
-                dtext = '∞' if node_dist == float('inf') else str(int(node_dist))
-                badge_x = x + size + 0.22
-                self.ax.text(badge_x, y, dtext, ha='center', va='center', fontsize=8, color='#1b2733', zorder=6,
-                             bbox=dict(boxstyle='round,pad=0.18', facecolor='white', edgecolor='#d0d5d9', alpha=0.95))
+        xy = scene["xy"]
+        if tree_view:
+            draw_edges(self.ax, xy, scene["edges"], color='#3f3f3f', width=3, alpha=0.9)
+        else:
+            # Road base, road edges and the dashed center lane: one collection each
+            roads = scene["roads"]
+            self.ax.add_collection(LineCollection(roads, linewidths=18, colors='#3f3f3f',
+                                                  capstyle='round', zorder=1, alpha=0.97))
+            for dy in (-0.28, 0.28):
+                self.ax.add_collection(LineCollection([r + (0, dy) for r in roads], linewidths=2.4,
+                                                      colors='#7a7a7a', capstyle='round', zorder=1.1, alpha=0.6))
+            self.ax.add_collection(LineCollection(roads, linewidths=2.0, colors='white', linestyles=[(0, (10, 8))],
+                                                  capstyle='round', zorder=2, alpha=0.95))
+
+        # Nodes (with shadow), names inside and distance badges to the right
+        radius = scene["radius"]
+        draw_circles(self.ax, xy + (0.10, -0.10), radius + 0.12, '#000', zorder=3, alpha=0.06)
+        draw_circles(self.ax, xy, radius, scene["face"], scene["edge"], linewidth=1.4, zorder=4)
+        LabelLayer(self.ax, xy, scene["names"], ha='center', va='center', fontsize=10,
+                   fontweight='bold', color='#1b2733', zorder=5)
+        badge_xy = xy + np.stack([radius + 0.22, np.zeros(len(xy))], axis=1)
+        LabelLayer(self.ax, badge_xy, scene["badges"], ha='center', va='center', fontsize=8,
+                   color='#1b2733', zorder=6,
+                   bbox=dict(boxstyle='round,pad=0.18', facecolor='white', edgecolor='#d0d5d9', alpha=0.95))
 
         # Auto-set limits so whole graph fits with padding
-        if all_x and all_y:
-            min_x = min(all_x); max_xv = max(all_x)
-            min_y = min(all_y); max_y = max(all_y)
-            x_pad = max(1.0, (max_xv - min_x) * 0.08)
-            y_pad = max(1.0, (max_y - min_y) * 0.18)
-            self.ax.set_xlim(min_x - x_pad, max_xv + x_pad)
-            self.ax.set_ylim(min_y - y_pad, max_y + y_pad)
-        else:
-            self.ax.set_xlim(-0.5, max_x + 0.5)
-            self.ax.set_ylim(- (n_dest - 1) * y_spacing / 2 - 2, (n_dest - 1) * y_spacing / 2 + 2)
+        min_x, min_y = xy.min(axis=0); max_xv, max_y = xy.max(axis=0)
+        x_pad = max(1.0, (max_xv - min_x) * 0.08)
+        y_pad = max(1.0, (max_y - min_y) * 0.18)
+        self.ax.set_xlim(min_x - x_pad, max_xv + x_pad)
+        self.ax.set_ylim(min_y - y_pad, max_y + y_pad)
 
         # Title and legend
+        source = highlight_source
         reachable_count = sum(1 for d in shortest_distances.values() if d != float('inf')) - 1
         total_cities = len(self.city_names) - 1
-        title_text = f"Road-style Paths from {source}  —  Reachable: {reachable_count}/{total_cities}"
+        style = "Shortest-path tree" if tree_view else "Road-style Paths"
+        title_text = f"{style} from {source}  —  Reachable: {reachable_count}/{total_cities}"
         self.ax.set_title(title_text, fontsize=12, fontweight='bold', pad=12, color='#2c3e50')
 
         legend_items = [
-            (plt.Line2D([0], [0], color='#3f3f3f', linewidth=6), "Road"),
-            (plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#FF6B6B', markersize=8, markeredgecolor='#CC2E2E'), "Source"),
-            (plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#44FF44', markersize=7, markeredgecolor='#00AA00'), "Destination (Reachable)"),
-            (plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#88B3FF', markersize=7, markeredgecolor='#0066CC'), "Destination (Unreachable)")
+            (Line2D([0], [0], color='#3f3f3f', linewidth=6), "Road"),
+            (Line2D([0], [0], marker='o', color='w', markerfacecolor='#FF6B6B', markersize=8, markeredgecolor='#CC2E2E'), "Source"),
+            (Line2D([0], [0], marker='o', color='w', markerfacecolor='#44FF44', markersize=7, markeredgecolor='#00AA00'), "Destination (Reachable)"),
+            (Line2D([0], [0], marker='o', color='w', markerfacecolor='#88B3FF', markersize=7, markeredgecolor='#0066CC'), "Destination (Unreachable)")
         ]
         handles, labels = zip(*legend_items)
         self.ax.legend(handles=handles, labels=labels, loc='upper center', bbox_to_anchor=(0.5, -0.03),
                        ncol=4, frameon=True, fancybox=True, shadow=False, fontsize=9, framealpha=0.95)
 
         # Verification warnings
-        if verification_messages:
+        if scene["messages"]:
             self.txt_output.insert(tk.END, "\n", "warn")
-            for msg in verification_messages:
+            for msg in scene["messages"]:
                 self.txt_output.insert(tk.END, msg + "\n", "warn")
 
         self.ax.axis('off')
         self.fig.tight_layout()
         self.canvas.draw()
+
+    def redraw(self):
+        """Re-render the last result (e.g. after toggling the tree view); scenes come from the cache"""
+        if self.last_drawing:
+            self.draw_graph(*self.last_drawing)
+
+    def road_scene(self, src, shortest_distances, parent):
+        """One road per destination following its route from the parent tree"""
+        import numpy as np
+        # Directed road weights from the road table (cheapest of parallel roads)
+        all_edges = {}
+        for a, b, w in self.store.edges():
+            if a != b and w < all_edges.get((a, b), float('inf')):
+                all_edges[(a, b)] = w
+
+        names = self.city_names
+        source = names[src]
+        destinations = [j for j in range(len(names)) if j != src]
+        n_dest = len(destinations)
+        y_spacing = 2.0
+        node_radius = 0.45
+        src_x = 0.8
+        max_x = 10.0
+
+        roads, xy, radius, face, edge, labels, badges, messages = [], [], [], [], [], [], [], []
+        for idx, j in enumerate(destinations):
+            dest = names[j]
+            y_pos = (idx - (n_dest - 1) / 2) * y_spacing
+            dest_dist = shortest_distances.get(dest, float('inf'))
+            reachable = dest_dist != float('inf')
+
+            # Route comes from the engine's parent tree, not re-derived here
+            path = path_from_parents(parent, src, j) if reachable else []
+            if path and path[0] == src:
+                sum_w = sum(all_edges.get((names[a], names[b]), 0) for a, b in zip(path, path[1:]))
+                if sum_w != dest_dist:
+                    messages.append(f"⚠ Path to {dest}: sum={sum_w} vs reported={dest_dist}")
+            else:
+                path = [src, j]
+
+            k = len(path)
+            xs = [src_x] + [src_x + (max_x - src_x) * i / (k - 1) for i in range(1, k)]
+            roads.append(np.array([(x, y_pos) for x in xs]))
+            for i, c in enumerate(path):
+                if i == 0:
+                    f, e, size = '#FF6B6B', '#CC2E2E', node_radius + 0.05
+                elif c == j:
+                    f, e = ('#44FF44', '#00AA00') if reachable else ('#88B3FF', '#0066CC')
+                    size = node_radius
+                else:
+                    f, e = ('#DFF5E0', '#A3C293') if reachable else ('#E6E9EE', '#BFC9CA')
+                    size = node_radius * 0.85
+                xy.append((xs[i], y_pos)); radius.append(size); face.append(f); edge.append(e)
+                labels.append(names[c])
+                node_dist = shortest_distances.get(names[c], float('inf'))
+                badges.append('∞' if node_dist == float('inf') else str(int(node_dist)))
+        if not xy:  # a single city: just the source
+            xy, radius, face, edge = [(src_x, 0.0)], [node_radius + 0.05], ['#FF6B6B'], ['#CC2E2E']
+            labels, badges = [source], ['0']
+        return {"roads": roads, "xy": np.array(xy, dtype=float), "radius": np.array(radius),
+                "face": face, "edge": edge, "names": labels, "badges": badges, "messages": messages}
+
+    def tree_scene(self, src, shortest_distances, parent):
+        """Every city once, x = depth in the shortest-path tree (unreachable cities on the left)"""
+        import numpy as np
+        from Route_Render import tree_layout
+        names = self.city_names
+        xy = tree_layout(parent, src) * (3.0, 1.4)
+        face, edge, badges = [], [], []
+        for j, name in enumerate(names):
+            d = shortest_distances.get(name, float('inf'))
+            if j == src:
+                f, e = '#FF6B6B', '#CC2E2E'
+            elif d != float('inf'):
+                f, e = '#44FF44', '#00AA00'
+            else:
+                f, e = '#88B3FF', '#0066CC'
+            face.append(f); edge.append(e)
+            badges.append('∞' if d == float('inf') else str(int(d)))
+        edges = [(p, v) for v, p in enumerate(parent) if p >= 0 and v != src]
+        return {"edges": edges, "xy": xy, "radius": np.full(len(names), 0.45),
+                "face": face, "edge": edge, "names": list(names), "badges": badges, "messages": []}
 # ...existing code...
     
 
@@ -359,82 +517,133 @@ class BellmanFordGUI:
 
 
 
-    def randomize_matrix(self):
-        """Fill the matrix with random distances for quick testing"""
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                if i != j:  # Skip diagonal (read-only)
-                    self.city_entries[i][j].delete(0, tk.END)
-                    self.city_entries[i][j].insert(0, str(random.randint(1, 50)))
+    def randomize_roads(self):
+        """Replace the roads with random distances for quick testing
+
+        Small city sets get a road between every pair (like the old matrix),
+        larger ones about four random roads per city.
+        """
+        names = self.store.base_names or self.city_names
+        n = len(names)
+        if n <= RANDOM_COMPLETE_MAX_CITIES:
+            pairs = [(a, b) for a in names for b in names if a != b]
+        else:
+            pairs = [(names[random.randrange(n)], names[random.randrange(n)]) for _ in range(4 * n)]
+            pairs = [(a, b) for a, b in pairs if a != b]
+        self.store.reset(names)
+        self.store.extend((a, b, str(random.randint(1, 50))) for a, b in pairs)
+        self.road_view.scroll_to(0)
+        self.roads_edited()
         # Don't draw graph yet - only after running algorithm
         self.txt_output.delete("1.0", tk.END)
         self.txt_output.insert(tk.END, "Random distances generated. Select source city and run algorithm.\n")
 
     def run_algorithm(self):
-        """Main function to run the Bellman-Ford algorithm using C backend"""
-        if not self.city_names:
-            messagebox.showerror("Error", "Create city matrix first"); return
-
-        # Build list of edges from the matrix
-        edges = []
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                val = self.city_entries[i][j].get().strip().upper()
-                if val and val not in ["", "INF", "0"]:
-                    try: edges.append(f"{self.city_names[i]} {self.city_names[j]} {int(val)}")
-                    except ValueError: continue
-
-        if not edges:
+        """Start Bellman-Ford on a worker thread; a new run supersedes the outstanding one"""
+        if not len(self.store):
+            messagebox.showerror("Error", "Create cities and add roads first"); return
+
+        # The store hands out the same Graph (and its result cache) until a road is edited;
+        # only the edited rows are parsed again
+        bad_rows = self.store.parse()
+        graph, self.city_names = self.store.graph()
+        if graph is not self.engine_graph:
+            graph.instrumentation = self.instrumentation
+            self.engine_graph = graph
+        self.road_view.refresh()  # tint invalid rows
+        if graph.E == 0:
             messagebox.showerror("Error", "No valid distances"); return
 
-        # Prepare input data in the format C program expects
         src_city = self.source_var.get()
-        V, E = self.city_count, len(edges)
-        data = f"{V} {E}\n" + "\n".join(self.city_names) + "\n" + "\n".join(edges) + "\n" + src_city + "\n"
+        if src_city not in self.city_names:
+            messagebox.showerror("Error", f"Unknown source city: {src_city}"); return
+        src = self.city_names.index(src_city)
+        instrumentation = self.instrumentation
+
+        def work(progress):
+            # Worker thread: only the engine runs here, widgets are touched in show_run_result
+            dist, parent = graph.shortest_path_tree(src, progress=progress)
+            return src_city, src, dist, parent, graph.last_stats, format_stats(instrumentation.last), bad_rows
+
+        self.show_progress(0, max(graph.V - 1, 1))
+        self.progress_label.config(text=f"Running from {src_city}")
+        self.query.start(work, self.show_run_result, self.show_progress, self.show_run_error)
+
+    def show_progress(self, done, total):
+        self.progress_bar.config(maximum=total, value=done)
+        # Passes, components or settled cities, depending on the engine
+        self.progress_label.config(text=f"Progress: {done} of {total}")
+
+    def cancel_run(self):
+        if self.query.running:
+            self.query.cancel()
+            self.progress_bar.config(value=0)
+            self.progress_label.config(text="Cancelled")
+
+    def show_run_error(self, error):
+        self.progress_label.config(text="Failed")
+        messagebox.showerror("Error", str(error))
+
+    def show_run_result(self, result):
+        """Back on the Tk thread: fill the results table and draw the routes"""
+        src_city, src, dist, parent, stats, stats_line, bad_rows = result
+        self.progress_bar.config(value=self.progress_bar['maximum'])
+        self.progress_label.config(text="Done")
+
+        # Results arrive as arrays: distance per city and the parent tree of routes
+        self.txt_output.delete("1.0", tk.END)
+        self.txt_output.insert(tk.END, f"Source City: {src_city}\n")
+        self.txt_output.insert(tk.END, "-" * 36 + "\n")
+        self.txt_output.insert(tk.END, f"{'City':<15}{'Distance':>10}\n")
+        self.txt_output.insert(tk.END, "-" * 36 + "\n")
+        for name, d in zip(self.city_names, dist):
+            self.txt_output.insert(tk.END, f"{name:<15}{'INF' if d == sys.maxsize else d:>10}\n")
+        self.txt_output.insert(tk.END, f"\nStats: {stats_line}\n")
+        if bad_rows:
+            row, problem = bad_rows[0]
+            self.txt_output.insert(tk.END, f"Skipped {len(bad_rows)} invalid road rows "
+                                           f"(first: row {row + 1}, {problem})\n", "warn")
+        if stats.get("negative_cycle"):
+            self.txt_output.insert(tk.END, "\nWarning: Graph contains negative weight cycle!\n", "warn")
+            messagebox.showerror("Error", "Graph contains a negative weight cycle!"); return
+
+        shortest_distances = {n: float('inf') if d == sys.maxsize else d for n, d in zip(self.city_names, dist)}
+        self.graph_data = True
+        self.draw_graph(highlight_source=src_city, shortest_distances=shortest_distances, parent=parent)
+
+    def run_all_pairs(self):
+        """All-pairs shortest paths over the road table with Floyd–Warshall"""
+        graph, self.city_names = self.store.graph()
+        if graph.E == 0:
+            messagebox.showerror("Error", "Create cities and add roads first"); return
+        if graph.V > ALL_PAIRS_MAX_CITIES:
+            messagebox.showerror("Error", f"All-pairs is limited to {ALL_PAIRS_MAX_CITIES} cities; "
+                                          "run the algorithm per source instead"); return
 
         try:
-            # Run the C program using subprocess - THIS IS WHERE ALGORITHM RUNS
-            result = subprocess.run(["./bellman_backend.exe"], input=data, text=True, capture_output=True)
-            self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, result.stdout)  # Display C output
-            self.parse_and_visualize_results(result.stdout, src_city)  # Parse and visualize
-        except FileNotFoundError:
-            messagebox.showerror("Error", "Compile C program: gcc bellman_backend.c -o bellman_backend.exe")
-
-    def parse_and_visualize_results(self, output, source_city):
-        """Parse the C program output and update graph with results"""
-        shortest_distances = {}
-        lines = [ln for ln in output.strip().split('\n') if ln.strip()]
-        parsing = False
-        for line in lines:
-            if 'Source City:' in line:
-                # next lines include table heading; start parsing after the next '----' line
-                parsing = False
-                continue
-            if '------------------------------------' in line:
-                parsing = not parsing
-                continue
-            if parsing and line.strip():
-                parts = line.split()
-                if len(parts) >= 2 and parts[0] in self.city_names:
-                    city, dist_str = parts[0], parts[1]
-                    shortest_distances[city] = float('inf') if dist_str == 'INF' else int(dist_str) if dist_str.lstrip('-').isdigit() else None
-
-        # As a fallback if parsing failed to capture the distances (some C outputs vary), try a simple extraction
-        if not shortest_distances:
-            for n in self.city_names:
-                # try to find a line like: "A              0"
-                for line in lines:
-                    if line.strip().startswith(n + ' '):
-                        parts = line.split()
-                        if len(parts) >= 2 and parts[0] == n:
-                            d = parts[1]
-                            shortest_distances[n] = float('inf') if d == 'INF' else int(d) if d.lstrip('-').isdigit() else None
-
-        # ensure source included
-        if source_city not in shortest_distances:
-            shortest_distances[source_city] = 0
-
-        self.graph_data = True; self.draw_graph(highlight_source=source_city, shortest_distances=shortest_distances)
+            dist, next_hop = graph.floyd_warshall()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e)); return
+
+        # Print the distance table: one row per source city
+        self.txt_output.delete("1.0", tk.END)
+        self.txt_output.insert(tk.END, "All-Pairs Shortest Distances (Floyd–Warshall)\n")
+        self.txt_output.insert(tk.END, "From\\To " + "".join(f"{n:>6}" for n in self.city_names) + "\n")
+        for i, name in enumerate(self.city_names):
+            cells = "".join(f"{'INF' if d == sys.maxsize else d:>6}" for d in dist[i])
+            self.txt_output.insert(tk.END, f"{name:<7} {cells}\n")
+
+        # Visualize the routes from the selected source
+        src = self.city_names.index(self.source_var.get()) if self.source_var.get() in self.city_names else 0
+        shortest_distances = {n: float('inf') if d == sys.maxsize else d for n, d in zip(self.city_names, dist[src])}
+        # The city before each destination on its route gives the parent tree
+        parent = [-1] * len(self.city_names)
+        for j in range(len(self.city_names)):
+            path = path_from_next_hop(next_hop, src, j)
+            if len(path) > 1:
+                parent[j] = path[-2]
+        self.graph_data = True
+        self.draw_graph(highlight_source=self.city_names[src], shortest_distances=shortest_distances, parent=parent)
 
 # Main program starts here
 if __name__ == "__main__":